@@ -0,0 +1,62 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+from settings import settings
+
+CacheKey = Tuple[str, str, str | None]
+
+
+class ResultCache:
+    """Recent new posts per (account, group link, last post link), bounded by TTL and LRU size.
+
+    The last post link is part of the key because it decides which of the group's posts count as new.
+    """
+
+    def __init__(self, ttl: float = settings.RESULT_CACHE_TTL, max_size: int = settings.RESULT_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: OrderedDict[CacheKey, Tuple[float, List]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, username: str, group, leads: List) -> None:
+        with self._lock:
+            key = self._key(username, group)
+            self._entries[key] = (time.monotonic(), leads)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get(self, username: str, group, max_age: float) -> Tuple[List, float] | None:
+        """The cached leads and their age in seconds, if younger than both ``max_age`` and the TTL."""
+        with self._lock:
+            key = self._key(username, group)
+            if not (entry := self._entries.get(key)):
+                return None
+
+            age = time.monotonic() - entry[0]
+            if age > self.ttl:
+                del self._entries[key]
+                return None
+            if age > max_age:
+                return None
+
+            self._entries.move_to_end(key)
+            return entry[1], age
+
+    def lookup(self, account, max_age: float) -> Dict[str, Tuple[List, float]]:
+        """Fresh cached results for the account's groups, keyed by group link."""
+        return {
+            group.group_link: hit
+            for group in account.groups
+            if (hit := self.get(account.username, group, max_age)) is not None
+        }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._entries), "max_size": self.max_size, "ttl": self.ttl}
+
+    @staticmethod
+    def _key(username: str, group) -> CacheKey:
+        return username, group.group_link, group.last_post_link
@@ -0,0 +1,693 @@
+import contextlib
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Set, Tuple
+from urllib.parse import unquote, urlsplit
+
+import psutil
+import seleniumwire.undetected_chromedriver as webdriver
+import undetected_chromedriver as uc
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.webdriver import WebDriver
+
+from interceptors import EXTENSION_TYPES, RequestBlocker
+from profiles import ProfileLease, profile_store
+from settings import LaunchProfileName, settings
+from utils import ScrapeCancelled
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class LaunchProfile:
+    arguments: Tuple[str, ...]
+    page_load_strategy: str = "normal"
+
+
+BASE_ARGUMENTS = (
+    "--headless",
+    "--disable-gpu",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--ignore-ssl-errors=yes",
+    "--ignore-certificate-errors",
+    "--blink-settings=imagesEnabled=false",
+    "--disable-notifications",
+    # Keep timers and rendering running in background tabs for multi-tab scraping.
+    "--disable-background-timer-throttling",
+    "--disable-backgrounding-occluded-windows",
+    "--disable-renderer-backgrounding",
+)
+
+LAUNCH_PROFILES: Dict[LaunchProfileName, LaunchProfile] = {
+    "default": LaunchProfile(BASE_ARGUMENTS),
+    "low_memory": LaunchProfile(
+        BASE_ARGUMENTS
+        + (
+            "--renderer-process-limit=1",
+            "--disable-extensions",
+            "--disable-background-networking",
+            "--disable-component-update",
+            "--disable-sync",
+            "--disable-site-isolation-trials",
+            "--disable-features=site-per-process,IsolateOrigins",
+            "--js-flags=--max-old-space-size=256",
+            "--mute-audio",
+        )
+    ),
+    # Hands the page back at DOMContentLoaded; the feed is rendered by scripts afterwards anyway.
+    "fast_load": LaunchProfile(BASE_ARGUMENTS, page_load_strategy="eager"),
+}
+
+
+@dataclass(frozen=True)
+class DriverSpec:
+    """Everything that makes two browsers interchangeable; the driver pool is keyed by it."""
+
+    proxy_url: str
+    profile: str | None = None
+    launch_profile: str = settings.CHROME_LAUNCH_PROFILE
+    proxy_mode: str = settings.PROXY_MODE
+
+    @classmethod
+    def for_account(cls, account) -> "DriverSpec":
+        return cls(
+            proxy_url=account.proxy_url,
+            profile=account.username if profile_store else None,
+            launch_profile=getattr(account, "launch_profile", None) or settings.CHROME_LAUNCH_PROFILE,
+        )
+
+
+@dataclass
+class DriverUsage:
+    created_at: float = field(default_factory=time.monotonic)
+    pages_loaded: int = 0
+    scroll_iterations: int = 0
+
+
+PROXY_AUTH_MANIFEST = {
+    "manifest_version": 2,
+    "name": "Proxy auth",
+    "version": "1.0",
+    "permissions": ["proxy", "webRequest", "webRequestBlocking", "<all_urls>"],
+    "background": {"scripts": ["background.js"]},
+    "minimum_chrome_version": "88",
+}
+
+PROXY_AUTH_SCRIPT = """
+chrome.webRequest.onAuthRequired.addListener(
+    () => ({authCredentials: {username: %s, password: %s}}),
+    {urls: ["<all_urls>"]},
+    ["blocking"]
+);
+"""
+
+
+def proxy_auth_extension(username: str, password: str) -> str:
+    """Unpacked extension answering the upstream proxy's auth challenge; Chrome has no flag for proxy credentials."""
+    digest = hashlib.sha256(f"{username}:{password}".encode()).hexdigest()[:16]
+    path = os.path.join(tempfile.gettempdir(), f"proxy-auth-{digest}")
+
+    if not os.path.exists(os.path.join(path, "background.js")):
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        with open(os.path.join(path, "manifest.json"), "w") as manifest:
+            json.dump(PROXY_AUTH_MANIFEST, manifest)
+        with open(os.path.join(path, "background.js"), "w") as script:
+            script.write(PROXY_AUTH_SCRIPT % (json.dumps(username), json.dumps(password)))
+
+    return path
+
+
+_patched_driver_lock = threading.Lock()
+_patched_driver_paths: Dict[Tuple[str, int], str] = {}
+
+
+def patched_chromedriver(
+    source: str = settings.CHROMEDRIVER_PATH,
+    version_main: int = settings.CHROME_VERSION_MAIN,
+) -> str:
+    """A patched copy of ``source`` cached on disk per Chrome version and chromedriver build.
+
+    Given the system binary, undetected-chromedriver patches that package-managed file in place on the first
+    launch, and concurrent first launches race writing it. The copy is patched once, under a file lock shared
+    by all workers. Every launch still reads the whole binary to check it is patched, cached copy or not.
+    """
+    with _patched_driver_lock:
+        if (path := _patched_driver_paths.get((source, version_main))) and os.path.exists(path):
+            return path
+
+        stat = os.stat(source)
+        os.makedirs(settings.CHROMEDRIVER_CACHE_DIR, exist_ok=True)
+        path = os.path.join(
+            settings.CHROMEDRIVER_CACHE_DIR, f"chromedriver-{version_main}-{stat.st_size}-{int(stat.st_mtime)}"
+        )
+
+        with open(f"{path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            if not uc.Patcher(executable_path=path, version_main=version_main).is_binary_patched():
+                started = time.perf_counter()
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                shutil.copy2(source, tmp_path)
+                uc.Patcher(executable_path=tmp_path, version_main=version_main).patch_exe()
+                os.replace(tmp_path, path)
+                logger.info(f"Cached patched chromedriver at {path} in {time.perf_counter() - started:.2f}s")
+
+        _patched_driver_paths[(source, version_main)] = path
+        return path
+
+
+def origin(url: str) -> str | None:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}" if parts.scheme in ("http", "https") else None
+
+
+def record_usage(driver: WebDriver, pages: int = 0, scrolls: int = 0) -> None:
+    if usage := getattr(driver, "usage", None):
+        usage.pages_loaded += pages
+        usage.scroll_iterations += scrolls
+
+
+def block_urls(driver: WebDriver, patterns: List[str]) -> None:
+    """Block ``patterns`` in the current tab; CDP's Network domain is per tab, so new tabs start unblocked."""
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+
+
+def prepare_new_tab(driver: WebDriver) -> None:
+    """Call after switching to a newly opened tab, before loading anything in it."""
+    if patterns := getattr(driver, "blocked_urls", None):
+        block_urls(driver, patterns)
+
+
+class WebDriverManager:
+    capture_modes = ("off", "scoped", "capped")
+    # wire: through selenium-wire's in-process MITM proxy (interception and capture available).
+    # native: Chrome connects to the upstream proxy itself, no Python in the traffic path.
+    proxy_modes = ("wire", "native")
+
+    def __init__(
+        self,
+        proxy_url: str,
+        profile: str | None = None,
+        launch_profile: str = settings.CHROME_LAUNCH_PROFILE,
+        capture_mode: str = settings.CAPTURE_MODE,
+        proxy_mode: str = settings.PROXY_MODE,
+    ):
+        self.check_modes(launch_profile, capture_mode, proxy_mode)
+        self.launch_profile = LAUNCH_PROFILES[launch_profile]
+        self.capture_mode = capture_mode
+        self.proxy_mode = proxy_mode
+        self.proxy = proxy_url
+        self.proxy_ip = proxy_url.split("@")[-1].split(":")[0]
+
+        selenium_options = {
+            "proxy": {
+                "http": proxy_url,
+            },
+            **self._capture_options(capture_mode),
+        }
+
+        self.profile: ProfileLease | None = profile_store.acquire(profile) if profile and profile_store else None
+
+        started = time.perf_counter()
+        try:
+            if proxy_mode == "native":
+                self.driver = uc.Chrome(
+                    options=self._init_options(),
+                    version_main=settings.CHROME_VERSION_MAIN,
+                    driver_executable_path=patched_chromedriver(),
+                    user_data_dir=self.profile.path if self.profile else None,
+                )
+            else:
+                self.driver = webdriver.Chrome(
+                    options=self._init_options(),
+                    seleniumwire_options=selenium_options,
+                    version_main=settings.CHROME_VERSION_MAIN,
+                    driver_executable_path=patched_chromedriver(),
+                    user_data_dir=self.profile.path if self.profile else None,
+                )
+        except BaseException:
+            self._release_profile()
+            raise
+        self.startup_seconds = time.perf_counter() - started
+        logger.info(f"Started {proxy_mode} driver for {self.proxy_ip} in {self.startup_seconds:.2f}s")
+
+        if capture_mode == "scoped" and proxy_mode == "wire":
+            # Out-of-scope requests also bypass the interceptors below, hence no blocking with scoped capture.
+            self.driver.scopes = settings.CAPTURE_SCOPES
+
+        self.blocker: RequestBlocker | None = None
+        if settings.REQUEST_BLOCKING and proxy_mode == "wire":
+            self.blocker = RequestBlocker()
+            self.driver.request_interceptor = self.blocker
+            self.driver.response_interceptor = self.blocker.record_response
+        elif settings.REQUEST_BLOCKING:
+            self._block_resource_types_natively()
+
+        self.driver.implicitly_wait(4)
+        self.usage = DriverUsage()
+        self.driver.usage = self.usage
+
+    @classmethod
+    def check_modes(
+        cls,
+        launch_profile: str = settings.CHROME_LAUNCH_PROFILE,
+        capture_mode: str = settings.CAPTURE_MODE,
+        proxy_mode: str = settings.PROXY_MODE,
+    ) -> None:
+        """Raises ``ValueError`` for unknown or conflicting modes; the defaults check the configured ones."""
+        if launch_profile not in LAUNCH_PROFILES:
+            raise ValueError(f"Unknown launch profile {launch_profile!r}, expected one of {sorted(LAUNCH_PROFILES)}")
+        if capture_mode not in cls.capture_modes:
+            raise ValueError(f"Unknown capture mode {capture_mode!r}, expected one of {cls.capture_modes}")
+        if proxy_mode not in cls.proxy_modes:
+            raise ValueError(f"Unknown proxy mode {proxy_mode!r}, expected one of {cls.proxy_modes}")
+        if capture_mode == "scoped" and proxy_mode == "wire" and settings.REQUEST_BLOCKING:
+            # selenium-wire skips its interceptors for requests outside driver.scopes.
+            raise ValueError("CAPTURE_MODE=scoped would disable request blocking outside CAPTURE_SCOPES")
+
+    def __enter__(self) -> WebDriver:
+        self.verify()
+        return self.driver
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.quit()
+
+    def verify(self) -> None:
+        st = self.driver.execute_script("return navigator.webdriver")
+        assert not st
+
+    def processes(self) -> List[psutil.Process]:
+        """chromedriver, Chrome and all of Chrome's child processes."""
+        pids = [getattr(self.driver, "browser_pid", None)]
+        if service := getattr(self.driver, "service", None):
+            pids.append(service.process.pid if service.process else None)
+
+        processes: List[psutil.Process] = []
+        for pid in filter(None, pids):
+            with contextlib.suppress(psutil.Error):
+                process = psutil.Process(pid)
+                processes += [process, *process.children(recursive=True)]
+        return processes
+
+    def rss(self) -> int:
+        total = 0
+        for process in self.processes():
+            with contextlib.suppress(psutil.Error):
+                total += process.memory_info().rss
+        return total
+
+    def clear_session(self) -> None:
+        """Forget the account's cookies, site storage and HTTP cache before another account leases the driver.
+
+        Otherwise the next account inherits the login, or Facebook links both accounts through local storage.
+        """
+        origins = {origin(settings.FB_MAIN_LINK), origin(self.driver.current_url)}
+        # Leave the page first, so its scripts can't write storage back after it was cleared.
+        self.driver.get("about:blank")
+        for page_origin in filter(None, origins):
+            # localStorage, IndexedDB, service workers, Cache Storage and the origin's cookies.
+            self.driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": page_origin, "storageTypes": "all"})
+        self.driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        self.driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+
+    def recycle_reason(self) -> str | None:
+        """Why the driver is past its configured limits, without touching the browser."""
+        if self.usage.pages_loaded >= settings.DRIVER_MAX_PAGES:
+            return f"loaded {self.usage.pages_loaded} pages"
+        if self.usage.scroll_iterations >= settings.DRIVER_MAX_SCROLLS:
+            return f"scrolled {self.usage.scroll_iterations} times"
+        if time.monotonic() - self.usage.created_at >= settings.DRIVER_MAX_AGE:
+            return "reached max age"
+        if (rss := self.rss()) >= settings.DRIVER_MAX_RSS_MB * 1024 * 1024:
+            return f"uses {rss >> 20} MB RSS"
+        return None
+
+    def health_problem(self) -> str | None:
+        """``recycle_reason`` plus a cheap script ping that catches hung or crashed browsers."""
+        if reason := self.recycle_reason():
+            return reason
+        try:
+            self.verify()
+        except AssertionError:
+            return "navigator.webdriver is exposed"
+        except WebDriverException as e:
+            return f"did not answer ping: {e.msg}"
+        return None
+
+    @classmethod
+    def from_spec(cls, spec: DriverSpec) -> "WebDriverManager":
+        return cls(
+            spec.proxy_url,
+            profile=spec.profile,
+            launch_profile=spec.launch_profile,
+            proxy_mode=spec.proxy_mode,
+        )
+
+    def quit(self) -> None:
+        if self.blocker:
+            logger.info(f"Request blocking for {self.proxy_ip}: {self.blocker.stats()}")
+        with contextlib.suppress(WebDriverException):
+            self.driver.quit()
+        self._release_profile()
+
+    def _release_profile(self) -> None:
+        if self.profile and profile_store:
+            profile_store.release(self.profile)
+            self.profile = None
+
+    @staticmethod
+    def _capture_options(capture_mode: str) -> Dict:
+        """selenium-wire storage settings; by default it keeps every request and response for the driver's life.
+
+        Requests are kept in memory and the oldest are evicted past ``request_storage_max_size``. A max size of 0
+        stores nothing while still running interceptors; ``disable_capture`` would skip the interceptors too.
+        """
+        if capture_mode == "off":
+            if not settings.REQUEST_BLOCKING:
+                return {"disable_capture": True}
+            return {"request_storage": "memory", "request_storage_max_size": 0}
+        return {"request_storage": "memory", "request_storage_max_size": settings.CAPTURE_MAX_REQUESTS}
+
+    def _init_options(self) -> Options:
+        options = Options()
+        arguments = list(self.launch_profile.arguments)
+
+        if self.proxy_mode == "native":
+            proxy = urlsplit(self.proxy)
+            arguments.append(f"--proxy-server={proxy.scheme or 'http'}://{proxy.hostname}:{proxy.port}")
+
+            if proxy.username:
+                extension = proxy_auth_extension(unquote(proxy.username), unquote(proxy.password or ""))
+                # Extensions only load in the new headless mode, and not at all with --disable-extensions.
+                arguments = [
+                    "--headless=new" if argument == "--headless" else argument
+                    for argument in arguments
+                    if argument != "--disable-extensions"
+                ]
+                arguments.append(f"--load-extension={extension}")
+
+        for argument in arguments:
+            options.add_argument(argument)
+        options.page_load_strategy = self.launch_profile.page_load_strategy
+        return options
+
+    def _block_resource_types_natively(self) -> None:
+        """Without the MITM proxy there is no interceptor; block by file extension through CDP instead."""
+        patterns = [
+            f"*.{extension}*"
+            for resource_type in settings.BLOCKED_RESOURCE_TYPES
+            for extension in EXTENSION_TYPES.get(resource_type, ())
+        ]
+        # Kept on the driver for prepare_new_tab, like usage for record_usage.
+        self.driver.blocked_urls = patterns
+        block_urls(self.driver, patterns)
+
+
+class DriverPool:
+    """Keeps warm, verified Chrome instances per ``DriverSpec`` so consecutive scrapes skip the cold launch.
+
+    At most ``max_size`` drivers (idle + leased) exist per spec, and only one for a spec with a persistent
+    profile; at most ``max_total`` exist altogether, the oldest idle driver of another spec making room for
+    a new one. Idle drivers are quit after ``idle_timeout`` seconds, but never below ``min_size`` per spec;
+    ``start_maintenance`` does that periodically and tops specs back up to ``min_size``.
+    """
+
+    def __init__(
+        self,
+        min_size: int = settings.DRIVER_POOL_MIN_SIZE,
+        max_size: int = settings.DRIVER_POOL_MAX_SIZE,
+        idle_timeout: float = settings.DRIVER_POOL_IDLE_TIMEOUT,
+        lease_timeout: float = settings.DRIVER_POOL_LEASE_TIMEOUT,
+        max_total: int = settings.DRIVER_POOL_MAX_TOTAL or settings.MAX_BROWSERS,
+        keep_profile_drivers: bool = True,
+    ):
+        if max_size < 1 or min_size > max_size or max_total < 1:
+            raise ValueError(f"Invalid pool bounds: min_size={min_size}, max_size={max_size}, max_total={max_total}")
+
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_total = max_total
+        # Off when several pools share the profiles: an idle driver would hold its profile's lock meanwhile.
+        self.keep_profile_drivers = keep_profile_drivers
+        self.idle_timeout = idle_timeout
+        self.lease_timeout = lease_timeout
+
+        self._idle: Dict[DriverSpec, List[Tuple[float, WebDriverManager]]] = {}
+        self._size: Dict[DriverSpec, int] = {}
+        # Specs without a profile seen so far, kept at min_size by maintain().
+        self._specs: Set[DriverSpec] = set()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._stopped = threading.Event()
+
+    @contextlib.contextmanager
+    def lease(self, spec: DriverSpec) -> Iterator[WebDriver]:
+        manager = self._acquire(spec)
+        try:
+            yield manager.driver
+        except ScrapeCancelled:
+            # Cancellation only fires between WebDriver commands, so the browser is still fine to reuse.
+            self._release(spec, manager)
+            raise
+        except BaseException:
+            # The browser may be mid-navigation or half logged in, don't hand it to the next scrape.
+            self._discard(spec, manager)
+            raise
+        else:
+            self._release(spec, manager)
+
+    def prewarm(self, spec: DriverSpec, count: int) -> int:
+        """Launch and verify up to ``count`` idle drivers for ``spec``; returns how many were started."""
+        with self._cond:
+            count = max(0, min(count, self._limit(spec) - self._size.get(spec, 0), self.max_total - self._total()))
+            if count:
+                self._size[spec] = self._size.get(spec, 0) + count
+            if not spec.profile:
+                self._specs.add(spec)
+
+        started = 0
+        for _ in range(count):
+            try:
+                manager = WebDriverManager.from_spec(spec)
+            except Exception:
+                logger.exception(f"Failed to prewarm driver for {self._describe(spec)}")
+                self._forget(spec)
+                continue
+
+            try:
+                manager.verify()
+            except (AssertionError, WebDriverException):
+                logger.exception(f"Prewarmed driver for {self._describe(spec)} failed verification")
+                self._discard(spec, manager)
+                continue
+
+            self._release(spec, manager)
+            started += 1
+
+        return started
+
+    def evict_idle(self) -> None:
+        with self._cond:
+            expired = self._pop_expired()
+        self._quit_all(expired)
+
+    def evict_all_idle(self) -> int:
+        """Quit every idle driver, whatever its age and ``min_size``; returns how many."""
+        with self._cond:
+            idle = [manager for managers in self._idle.values() for _, manager in managers]
+            for spec, managers in self._idle.items():
+                self._size[spec] -= len(managers)
+                if not self._size[spec]:
+                    del self._size[spec]
+            self._idle.clear()
+            self._cond.notify_all()
+        self._quit_all(idle)
+        return len(idle)
+
+    def maintain(self) -> None:
+        """Quit drivers idle for too long and top every spec seen so far back up to ``min_size``."""
+        self.evict_idle()
+        for spec in list(self._specs):
+            with self._cond:
+                missing = self.min_size - self._size.get(spec, 0)
+            if missing > 0 and not self._closed:
+                self.prewarm(spec, missing)
+
+    def start_maintenance(self, interval: float = settings.DRIVER_POOL_MAINTENANCE_INTERVAL) -> None:
+        def run() -> None:
+            while not self._stopped.wait(interval):
+                try:
+                    self.maintain()
+                except Exception:
+                    logger.exception("Driver pool maintenance failed")
+
+        threading.Thread(target=run, name="driver-pool-maintenance", daemon=True).start()
+
+    def close(self) -> None:
+        self._stopped.set()
+        with self._cond:
+            self._closed = True
+            idle = [manager for managers in self._idle.values() for _, manager in managers]
+            self._idle.clear()
+            self._cond.notify_all()
+        self._quit_all(idle)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._cond:
+            return {
+                self._describe(spec): {"size": size, "idle": len(self._idle.get(spec, []))}
+                for spec, size in self._size.items()
+            }
+
+    def _acquire(self, spec: DriverSpec) -> WebDriverManager:
+        deadline = time.monotonic() + self.lease_timeout
+
+        while True:
+            manager: WebDriverManager | None = None
+
+            with self._cond:
+                expired = self._pop_expired()
+
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Driver pool is closed")
+
+                    idle = self._idle.get(spec)
+                    if idle:
+                        _, manager = idle.pop()
+                        if not idle:
+                            # _pop_expired and evict_all_idle expect every idle spec to still have a size.
+                            del self._idle[spec]
+                        break
+
+                    if self._size.get(spec, 0) < self._limit(spec):
+                        if self._total() >= self.max_total and (oldest := self._pop_oldest_idle()):
+                            expired.append(oldest)
+                        if self._total() < self.max_total:
+                            self._size[spec] = self._size.get(spec, 0) + 1
+                            if not spec.profile:
+                                self._specs.add(spec)
+                            break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"No driver available for {self._describe(spec)}")
+                    self._cond.wait(remaining)
+
+            self._quit_all(expired)
+
+            if manager is None:
+                try:
+                    manager = WebDriverManager.from_spec(spec)
+                    manager.verify()
+                except BaseException:
+                    self._forget(spec)
+                    raise
+                return manager
+
+            if problem := manager.health_problem():
+                logger.warning(f"Recycling pooled driver for {self._describe(spec)}: {problem}")
+                self._discard(spec, manager)
+                continue
+
+            return manager
+
+    def _release(self, spec: DriverSpec, manager: WebDriverManager) -> None:
+        if reason := manager.recycle_reason():
+            logger.info(f"Recycling driver for {self._describe(spec)}: {reason}")
+            self._discard(spec, manager)
+            return
+
+        if spec.profile and not self.keep_profile_drivers:
+            self._discard(spec, manager)
+            return
+
+        if not spec.profile:
+            # Drivers without a profile are shared by every account on the proxy.
+            try:
+                manager.clear_session()
+            except WebDriverException:
+                logger.warning(f"Failed to clear the session of driver for {self._describe(spec)}, recycling it")
+                self._discard(spec, manager)
+                return
+
+        with self._cond:
+            if not self._closed:
+                self._idle.setdefault(spec, []).append((time.monotonic(), manager))
+                self._cond.notify_all()
+                return
+
+        self._discard(spec, manager)
+
+    def _discard(self, spec: DriverSpec, manager: WebDriverManager) -> None:
+        manager.quit()
+        self._forget(spec)
+
+    def _forget(self, spec: DriverSpec) -> None:
+        with self._cond:
+            self._size[spec] -= 1
+            if not self._size[spec]:
+                del self._size[spec]
+            self._cond.notify_all()
+
+    def _pop_expired(self) -> List[WebDriverManager]:
+        """Must be called with the lock held; quit the returned drivers after releasing it."""
+        now = time.monotonic()
+        expired: List[WebDriverManager] = []
+
+        for spec, idle in list(self._idle.items()):
+            # Idle drivers are appended on release, so the oldest are at the front.
+            while idle and now - idle[0][0] > self.idle_timeout and self._size[spec] > self.min_size:
+                _, manager = idle.pop(0)
+                expired.append(manager)
+                self._size[spec] -= 1
+
+            if not idle:
+                del self._idle[spec]
+            if not self._size[spec]:
+                del self._size[spec]
+
+        if expired:
+            self._cond.notify_all()
+        return expired
+
+    def _pop_oldest_idle(self) -> WebDriverManager | None:
+        """Must be called with the lock held; the longest idle driver of any spec, to quit for a new one."""
+        candidates = [(idle[0][0], spec) for spec, idle in self._idle.items() if idle]
+        if not candidates:
+            return None
+
+        _, spec = min(candidates, key=lambda candidate: candidate[0])
+        _, manager = self._idle[spec].pop(0)
+        if not self._idle[spec]:
+            del self._idle[spec]
+        self._size[spec] -= 1
+        if not self._size[spec]:
+            del self._size[spec]
+        return manager
+
+    def _total(self) -> int:
+        return sum(self._size.values())
+
+    @staticmethod
+    def _quit_all(managers: List[WebDriverManager]) -> None:
+        for manager in managers:
+            manager.quit()
+
+    def _limit(self, spec: DriverSpec) -> int:
+        return 1 if spec.profile else self.max_size
+
+    @staticmethod
+    def _describe(spec: DriverSpec) -> str:
+        proxy_ip = spec.proxy_url.split("@")[-1].split(":")[0]
+        return "/".join(filter(None, (proxy_ip, spec.profile, spec.launch_profile, spec.proxy_mode)))
@@ -0,0 +1,352 @@
+import asyncio
+import atexit
+import logging
+import math
+import multiprocessing
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Tuple
+
+import psutil
+
+from drivers import DriverPool
+from models import Account
+from scrapper import GroupCallback, ScrapeContext, Scrapper
+from settings import settings
+from utils import CancellationToken
+
+logger = logging.getLogger(__name__)
+
+ScrapeResult = Dict[str, List]
+
+# Weight of the latest scrape in the moving average of scrape durations.
+DURATION_EWMA_WEIGHT = 0.2
+
+
+class ExecutorFull(RuntimeError):
+    """No room for another scrape; ``retry_after`` is the estimated number of seconds until there is."""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ScrapeExecutor:
+    """Thread pool sized by how many browsers the box can hold, with a bounded wait queue.
+
+    Scrapes never run on the loop's default executor, so they can't starve ``asyncio.to_thread`` users,
+    and at most ``max_browsers`` of them (each owning a Chrome) run at once. New scrapes are also refused
+    while the machine is short of memory for one more Chrome.
+    """
+
+    def __init__(
+        self,
+        scrapper: Scrapper,
+        max_browsers: int = settings.MAX_BROWSERS,
+        max_queue: int = settings.MAX_QUEUED_SCRAPES,
+    ):
+        self.scrapper = scrapper
+        self.max_browsers = max_browsers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_browsers, thread_name_prefix="scrape")
+        self._lock = threading.Lock()
+        self._running = 0
+        self._queued = 0
+        self._duration = settings.SCRAPE_DURATION_ESTIMATE
+
+    def submit(
+        self,
+        account: Account,
+        on_start: Callable[[], None],
+        on_group: GroupCallback,
+        context: ScrapeContext | None = None,
+    ) -> "asyncio.Future[ScrapeResult]":
+        """Raises ``ExecutorFull`` right away instead of queueing past ``max_queue`` waiting scrapes.
+
+        Await ``make_room`` first, so idle drivers don't count against the memory check.
+        """
+        self._admit()
+        future = self._pool.submit(self._scrape, account, on_start, on_group, context or ScrapeContext())
+        future.add_done_callback(self._forget_cancelled)
+        return asyncio.wrap_future(future)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "running": self._running,
+                "queued": self._queued,
+                "max_browsers": self.max_browsers,
+                "max_queue": self.max_queue,
+                "utilization": self._running / self.max_browsers,
+                "scrape_seconds_avg": round(self._duration, 1),
+                "available_memory_mb": available_memory_mb(),
+            }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+    async def make_room(self) -> None:
+        """Quit idle drivers, off the event loop, when memory is short for one more browser; ``submit`` re-checks."""
+        if self._memory_short() and (freed := await asyncio.to_thread(self._free_idle_drivers)):
+            logger.info(f"Quit {freed} idle drivers to free memory for a new scrape")
+
+    def _admit(self) -> None:
+        with self._lock:
+            if self._running + self._queued >= self.max_browsers + self.max_queue:
+                # Waits for the scrapes ahead of it in the queue, max_browsers at a time.
+                retry_after = self._duration * (self._queued + 1) / self.max_browsers
+                raise ExecutorFull(f"{self._running} scrapes running and {self._queued} queued", math.ceil(retry_after))
+
+            if self._memory_short():
+                # Memory comes back when the next running scrape finishes and its browser goes idle or quits.
+                retry_after = self._duration / max(self._running, 1)
+                message = f"Only {available_memory_mb()} MB of memory available for {self._queued + 1} new browsers"
+                raise ExecutorFull(message, max(1, math.ceil(retry_after)))
+
+            self._queued += 1
+
+    def _memory_short(self) -> bool:
+        """Whether the scrapes still waiting to start, plus one more, would leave too little memory free."""
+        needed = settings.MIN_FREE_MEMORY_MB + settings.BROWSER_MEMORY_MB * (self._queued + 1)
+        return available_memory_mb() < needed
+
+    def _free_idle_drivers(self) -> int:
+        return self.scrapper.pool.evict_all_idle() if self.scrapper.pool else 0
+
+    def _started(self) -> None:
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+
+    def _record_duration(self, seconds: float) -> None:
+        with self._lock:
+            self._duration += DURATION_EWMA_WEIGHT * (seconds - self._duration)
+
+    def _scrape(
+        self, account: Account, on_start: Callable[[], None], on_group: GroupCallback, context: ScrapeContext
+    ) -> ScrapeResult:
+        self._started()
+        started_at = time.monotonic()
+        try:
+            on_start()
+            new_posts = self.scrapper.get_new_posts(account, on_group, context)
+            self._record_duration(time.monotonic() - started_at)
+            return new_posts
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    def _forget_cancelled(self, future: Future) -> None:
+        # Cancelled before a thread picked it up, so _scrape never ran.
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+
+
+def available_memory_mb() -> int:
+    return psutil.virtual_memory().available // 2**20
+
+
+_worker_scrapper: Scrapper | None = None
+_worker_events = None
+
+
+def _init_worker(events) -> None:
+    global _worker_scrapper, _worker_events
+
+    # A worker runs one scrape at a time; MAX_BROWSERS bounds the workers, so one driver each is enough.
+    # The account's next scrape may land on another worker, so profile-backed drivers must let go of the
+    # profile lock right away instead of idling on it.
+    pool = DriverPool(max_total=1, keep_profile_drivers=False)
+    pool.start_maintenance()
+    atexit.register(pool.close)
+    _worker_scrapper = Scrapper(pool)
+    _worker_events = events
+
+
+def _scrape_in_worker(
+    token: str, account: Account, context: ScrapeContext
+) -> Tuple[ScrapeResult, list[dict] | None, ScrapeContext]:
+    _worker_events.put((token, "start", None))
+
+    def on_group(group_link: str, leads: List) -> None:
+        # The group's share of the context travels along, for listeners that look at it right away.
+        truncated = group_link in context.truncated_groups
+        _worker_events.put((token, "group", (group_link, leads, truncated, context.scroll_metrics.get(group_link))))
+
+    new_posts = _worker_scrapper.get_new_posts(account, on_group, context)
+    return new_posts, account.new_cookies, context
+
+
+@dataclass
+class _PendingScrape:
+    account: Account
+    on_start: Callable[[], None]
+    on_group: GroupCallback
+    context: ScrapeContext
+    pool: ProcessPoolExecutor
+    result: Future = field(default_factory=Future)
+    worker_future: Future | None = None
+    started_at: float | None = None
+    resubmitted: bool = False
+
+
+class ProcessScrapeExecutor(ScrapeExecutor):
+    """Runs each scrape in a supervised worker process that owns its own drivers.
+
+    Parsing no longer contends on the API process's GIL. A crashing worker breaks the whole
+    ``ProcessPoolExecutor``, failing every scrape running in it at that moment; the pool is replaced and
+    the scrapes that hadn't reached a worker yet are resubmitted to the new one, once.
+
+    Workers report progress through a manager queue that a thread of this process dispatches. Completion
+    goes through the same queue, after the worker's own events, so no group arrives after its result.
+    """
+
+    def __init__(
+        self,
+        max_browsers: int = settings.MAX_BROWSERS,
+        max_queue: int = settings.MAX_QUEUED_SCRAPES,
+    ):
+        self.max_browsers = max_browsers
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._running = 0
+        self._queued = 0
+        self._duration = settings.SCRAPE_DURATION_ESTIMATE
+
+        self._context = multiprocessing.get_context("spawn")
+        self._manager = self._context.Manager()
+        self._events = self._manager.Queue()
+        self._pending: Dict[str, _PendingScrape] = {}
+        self._pool = self._new_pool()
+
+        self._dispatcher = threading.Thread(target=self._dispatch, name="scrape-events", daemon=True)
+        self._dispatcher.start()
+
+    def submit(
+        self,
+        account: Account,
+        on_start: Callable[[], None],
+        on_group: GroupCallback,
+        context: ScrapeContext | None = None,
+    ) -> "asyncio.Future[ScrapeResult]":
+        self._admit()
+        token = uuid.uuid4().hex
+        context = context or ScrapeContext()
+        # A thread event can't be shared with the worker; swap in a manager one, keeping its state.
+        cancellation = CancellationToken(self._manager.Event())
+        if context.cancellation.cancelled:
+            cancellation.cancel()
+        context.cancellation = cancellation
+
+        with self._lock:
+            pending = _PendingScrape(account, on_start, on_group, context, pool=self._pool)
+            self._pending[token] = pending
+        self._submit_to_pool(token, pending)
+        return asyncio.wrap_future(pending.result)
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        self._events.put(None)
+        self._dispatcher.join(timeout=10)
+        self._manager.shutdown()
+
+    def _submit_to_pool(self, token: str, pending: _PendingScrape) -> None:
+        try:
+            pending.worker_future = pending.pool.submit(_scrape_in_worker, token, pending.account, pending.context)
+        except BrokenProcessPool:
+            pending.pool = self._replace_pool(pending.pool)
+            pending.worker_future = pending.pool.submit(_scrape_in_worker, token, pending.account, pending.context)
+
+        pending.worker_future.add_done_callback(lambda _: self._events.put((token, "finish", None)))
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.max_browsers,
+            mp_context=self._context,
+            initializer=_init_worker,
+            initargs=(self._events,),
+            max_tasks_per_child=settings.PROCESS_MAX_TASKS_PER_CHILD or None,
+        )
+
+    def _free_idle_drivers(self) -> int:
+        # Worker pools are out of reach from here; their maintenance threads evict idle drivers on their own.
+        return 0
+
+    def _replace_pool(self, broken: ProcessPoolExecutor) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is broken:
+                logger.error("Scrape worker pool broke, starting a new one")
+                self._pool = self._new_pool()
+                broken.shutdown(wait=False, cancel_futures=True)
+            return self._pool
+
+    def _dispatch(self) -> None:
+        while (event := self._events.get()) is not None:
+            token, kind, payload = event
+            with self._lock:
+                if not (pending := self._pending.get(token)):
+                    continue
+                if kind == "start":
+                    pending.started_at = time.monotonic()
+                    self._queued -= 1
+                    self._running += 1
+            try:
+                if kind == "start":
+                    pending.on_start()
+                elif kind == "group":
+                    group_link, leads, truncated, scroll_metrics = payload
+                    if truncated and group_link not in pending.context.truncated_groups:
+                        pending.context.truncated_groups.append(group_link)
+                    if scroll_metrics:
+                        pending.context.scroll_metrics[group_link] = scroll_metrics
+                    pending.on_group(group_link, leads)
+                else:
+                    self._finish(token, pending)
+            except Exception:
+                logger.exception(f"Scrape progress listener failed on {kind}")
+
+    def _finish(self, token: str, pending: _PendingScrape) -> None:
+        done = pending.worker_future
+        if (
+            pending.started_at is None
+            and not pending.resubmitted
+            and not done.cancelled()
+            and isinstance(done.exception(), BrokenProcessPool)
+            and not pending.result.cancelled()
+        ):
+            # Still queued when another scrape's worker crashed: it had nothing to do with it, run it again.
+            logger.warning("Resubmitting a queued scrape to the replacement worker pool")
+            pending.resubmitted = True
+            pending.pool = self._replace_pool(pending.pool)
+            self._submit_to_pool(token, pending)
+            return
+
+        with self._lock:
+            del self._pending[token]
+            if pending.started_at is not None:
+                self._running -= 1
+            else:
+                self._queued -= 1
+
+        if pending.result.cancelled():
+            # The caller gave up waiting (e.g. on shutdown); nobody is left to hand the result to.
+            return
+        if done.cancelled():
+            pending.result.cancel()
+        elif error := done.exception():
+            pending.result.set_exception(error)
+            if isinstance(error, BrokenProcessPool):
+                self._replace_pool(pending.pool)
+        else:
+            # Copy refreshed cookies, truncated groups and scroll metrics back onto the caller's objects.
+            new_posts, pending.account.new_cookies, context = done.result()
+            pending.context.truncated_groups[:] = context.truncated_groups
+            pending.context.scroll_metrics.update(context.scroll_metrics)
+            if pending.started_at is not None:
+                self._record_duration(time.monotonic() - pending.started_at)
+            pending.result.set_result(new_posts)
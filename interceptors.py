@@ -0,0 +1,89 @@
+import logging
+import posixpath
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable
+from urllib.parse import urlsplit
+
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+EXTENSION_TYPES = {
+    "video": ("mp4", "webm", "m4s", "m4v", "mov", "m3u8", "mpd", "ts"),
+    "audio": ("mp3", "m4a", "aac", "ogg", "oga", "wav", "opus"),
+    "font": ("woff", "woff2", "ttf", "otf", "eot"),
+    "image": ("jpg", "jpeg", "png", "gif", "webp", "avif", "svg", "ico", "bmp"),
+}
+
+# Sec-Fetch-Dest values that map onto our resource types.
+FETCH_DEST_TYPES = {
+    "video": "video",
+    "audio": "audio",
+    "track": "video",
+    "font": "font",
+    "image": "image",
+    "object": "video",
+    "embed": "video",
+}
+
+
+class RequestBlocker:
+    """selenium-wire request interceptor that aborts traffic the ``role=feed`` DOM does not need.
+
+    Aborted responses are never downloaded, so their size is unknown; ``blocked_bytes`` counts the
+    request headers and bodies (mostly tracking beacons) that never left through the proxy.
+    ``allowed_bytes`` counts response bodies that did, for comparison.
+    """
+
+    def __init__(
+        self,
+        resource_types: Iterable[str] = settings.BLOCKED_RESOURCE_TYPES,
+        url_patterns: Iterable[str] = settings.BLOCKED_URL_PATTERNS,
+    ):
+        self.resource_types = frozenset(resource_types)
+        self.url_pattern = re.compile("|".join(f"(?:{pattern})" for pattern in url_patterns)) if url_patterns else None
+
+        self.blocked: Counter = Counter()
+        self.blocked_bytes = 0
+        self.allowed_requests = 0
+        self.allowed_bytes = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, request) -> None:
+        category = self.block_category(request.url, request.headers.get("Sec-Fetch-Dest", ""))
+        if not category:
+            return
+
+        size = len(request.body or b"") + sum(len(k) + len(v) + 4 for k, v in request.headers.items())
+        with self._lock:
+            self.blocked[category] += 1
+            self.blocked_bytes += size
+        request.abort(error_code=204)
+
+    def record_response(self, request, response) -> None:
+        """selenium-wire response interceptor, only used for accounting."""
+        size = int(response.headers.get("Content-Length") or len(response.body or b""))
+        with self._lock:
+            self.allowed_requests += 1
+            self.allowed_bytes += size
+
+    def block_category(self, url: str, fetch_dest: str) -> str | None:
+        if self.url_pattern and self.url_pattern.search(url):
+            return "tracking"
+
+        resource_type = FETCH_DEST_TYPES.get(fetch_dest.lower())
+        if not resource_type and (extension := posixpath.splitext(urlsplit(url).path)[1][1:].lower()):
+            resource_type = next((t for t, extensions in EXTENSION_TYPES.items() if extension in extensions), None)
+
+        return resource_type if resource_type in self.resource_types else None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "blocked_requests": dict(self.blocked),
+                "blocked_bytes": self.blocked_bytes,
+                "allowed_requests": self.allowed_requests,
+                "allowed_bytes": self.allowed_bytes,
+            }
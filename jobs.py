@@ -0,0 +1,358 @@
+import asyncio
+import contextlib
+import logging
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Set, Tuple
+
+from cache import ResultCache
+from executors import ExecutorFull, ScrapeExecutor
+from models import Account
+from scrapper import Lead, ScrapeContext
+from settings import settings
+from utils import Deadline, ScrapeCancelled
+
+logger = logging.getLogger(__name__)
+
+
+def coalescing_key(account: Account) -> Tuple:
+    """Scrapes are only merged when they would scrape the same groups from the same point."""
+    return account.username, frozenset((group.group_link, group.last_post_link) for group in account.groups)
+
+
+@dataclass
+class Job:
+    account: Account
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = "queued"
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    # Filled group by group while the scrape runs, so requests attaching late still get every group.
+    result: Dict[str, List[Lead]] = field(default_factory=dict)
+    # Some request polls GET /jobs/{id}; jobs that are only streamed are cancelled once nobody listens.
+    polled: bool = True
+    groups_done: int = 0
+    # Age in seconds of the groups answered from the result cache.
+    cache_ages: Dict[str, float] = field(default_factory=dict)
+    error: str | None = None
+    # Carries the deadline into the scrape and the groups it had to cut short back out.
+    context: ScrapeContext = field(default_factory=ScrapeContext, repr=False)
+    _loop: asyncio.AbstractEventLoop = field(default_factory=asyncio.get_running_loop, repr=False)
+    _subscribers: List[asyncio.Queue] = field(default_factory=list, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+    @property
+    def cancelled(self) -> bool:
+        return self.context.cancellation.cancelled
+
+    def subscribe(self) -> asyncio.Queue:
+        """Queue of ``("group", (group_link, leads))`` events, ending with ``("end", None)``.
+
+        Groups finished before subscribing are replayed first.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        for group_link, leads in self.result.items():
+            queue.put_nowait(("group", (group_link, leads)))
+
+        if self.finished:
+            queue.put_nowait(("end", None))
+        else:
+            self._subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        with contextlib.suppress(ValueError):
+            self._subscribers.remove(queue)
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+
+    def cancel(self) -> None:
+        """Ask the scrape to stop at its next wait; the job ends as ``cancelled`` once it has."""
+        if not self.finished:
+            self.context.cancellation.cancel()
+
+    def mark_started(self) -> None:
+        self.status = "running"
+        self.started_at = time.time()
+
+    def record_group(self, group_link: str, leads: List[Lead]) -> None:
+        """Called from the scrape's thread."""
+        self._loop.call_soon_threadsafe(self._publish, "group", (group_link, leads))
+
+    def record_cached_group(self, group_link: str, leads: List[Lead], age: float) -> None:
+        self.result[group_link] = leads
+        self.cache_ages[group_link] = age
+        self.groups_done += 1
+
+    def finish(self, status: str, error: str | None = None) -> None:
+        self.status = status
+        self.error = error
+        self.finished_at = time.time()
+        self._publish("end", None)
+        self._subscribers.clear()
+
+    def _publish(self, kind: str, payload) -> None:
+        if kind == "group":
+            self.groups_done += 1
+            self.result[payload[0]] = payload[1]
+
+        for queue in self._subscribers:
+            queue.put_nowait((kind, payload))
+
+    def to_dict(self) -> Dict:
+        now = time.time()
+        return {
+            "job_id": self.id,
+            "account": self.account.username,
+            "status": self.status,
+            "result": self.result,
+            "groups_done": self.groups_done,
+            "groups_total": len(self.account.groups),
+            "cache_age": self.cache_ages,
+            "new_cookies": self.account.new_cookies,
+            "error": self.error,
+            "truncated": self.context.truncated,
+            "truncated_groups": self.context.truncated_groups,
+            "scroll_metrics": self.context.scroll_metrics,
+            "timings": {
+                "created_at": self.created_at,
+                "queued_seconds": (self.started_at or now) - self.created_at,
+                "run_seconds": (self.finished_at or now) - self.started_at if self.started_at else None,
+            },
+        }
+
+
+@dataclass
+class Batch:
+    jobs: List[Job]
+    concurrency: int
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    created_at: float = field(default_factory=time.time)
+
+    @property
+    def finished(self) -> bool:
+        return all(job.finished for job in self.jobs)
+
+    def to_dict(self) -> Dict:
+        statuses = Counter(job.status for job in self.jobs)
+        finished_at = max((job.finished_at for job in self.jobs), default=None) if self.finished else None
+        return {
+            "batch_id": self.id,
+            "status": "done" if self.finished else "running",
+            "concurrency": self.concurrency,
+            "jobs_total": len(self.jobs),
+            "jobs_by_status": dict(statuses),
+            "groups_done": sum(job.groups_done for job in self.jobs),
+            "groups_total": sum(len(job.account.groups) for job in self.jobs),
+            "elapsed_seconds": (finished_at or time.time()) - self.created_at,
+            "jobs": [
+                {"job_id": job.id, "account": job.account.username, "status": job.status, "error": job.error}
+                for job in self.jobs
+            ],
+        }
+
+
+class JobQueue:
+    """Runs scrapes in the background so ``POST /scrape`` can answer with a job id right away."""
+
+    def __init__(self, executor: ScrapeExecutor, cache: ResultCache):
+        self.executor = executor
+        self.cache = cache
+        self.jobs: Dict[str, Job] = {}
+        self.batches: Dict[str, Batch] = {}
+        # Coalescing: the running job per account and group list, and the job per client idempotency key.
+        self._running_by_account: Dict[Tuple, Job] = {}
+        self._by_idempotency_key: Dict[str, Job] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def submit(
+        self,
+        account: Account,
+        polled: bool = True,
+        idempotency_key: str | None = None,
+        max_cache_age: float = 0,
+        deadline: Deadline | None = None,
+    ) -> Tuple[Job, bool]:
+        """Returns the job and whether it was created; duplicates attach to the existing job.
+
+        A scrape of the same account and groups as one already running, or a repeated idempotency key, gets
+        the existing job instead of a second browser logging in with the same cookies. Groups cached less
+        than ``max_cache_age`` seconds ago are not scraped again; if all are, the job is done right away.
+        Groups still running when ``deadline`` passes return partial leads and are reported as truncated.
+        Raises ``ExecutorFull`` when no browser slot or queue place is left.
+        """
+        # Nothing awaits past this point, so no duplicate can register in between the check and _register.
+        await self.executor.make_room()
+        self._prune()
+        if job := self._existing(account, idempotency_key):
+            job.polled = job.polled or polled
+            return job, False
+
+        job = Job(account=account, polled=polled, context=ScrapeContext(deadline or Deadline()))
+        cached = self.cache.lookup(account, max_cache_age) if max_cache_age else {}
+        for group_link, (leads, age) in cached.items():
+            job.record_cached_group(group_link, leads, age)
+
+        if len(cached) == len(account.groups):
+            self.jobs[job.id] = job
+            job.finish("done")
+            return job, True
+
+        scrape_account = account
+        if cached:
+            scrape_account = account.model_copy(
+                update={"groups": [group for group in account.groups if group.group_link not in cached]}
+            )
+
+        future = self.executor.submit(
+            scrape_account, job.mark_started, self._group_recorder(job, scrape_account), job.context
+        )
+        self._register(job, idempotency_key)
+
+        self._spawn(self._run(job, future, scrape_account))
+        return job, True
+
+    def submit_batch(self, accounts: List[Account], concurrency: int, deadline_seconds: float = 0) -> Batch:
+        """Queue one job per account; at most ``concurrency`` of them hold an executor slot at a time.
+
+        Accounts already being scraped join the batch with their running job, and an account listed twice
+        joins it once. Each job's deadline of ``deadline_seconds`` starts when it gets its slot, not while it
+        waits behind the others.
+        """
+        self._prune()
+        jobs: Dict[str, Job] = {}
+        new_jobs: List[Job] = []
+
+        for account in accounts:
+            if not (job := self._existing(account, None)):
+                job = Job(account=account)
+                self._register(job, None)
+                new_jobs.append(job)
+            jobs[job.id] = job
+
+        batch = Batch(jobs=list(jobs.values()), concurrency=concurrency)
+        self.batches[batch.id] = batch
+
+        self._spawn(self._run_batch(new_jobs, concurrency, deadline_seconds))
+        return batch
+
+    def get(self, job_id: str) -> Job | None:
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Job | None:
+        if job := self.jobs.get(job_id):
+            job.cancel()
+            if self._running_by_account.get(coalescing_key(job.account)) is job:
+                # Let the next scrape of this account start its own job instead of joining a dying one.
+                del self._running_by_account[coalescing_key(job.account)]
+        return job
+
+    def release(self, job: Job) -> None:
+        """Called when a streaming client goes away: cancel the job unless someone else still wants it."""
+        if not job.polled and not job.has_subscribers:
+            logger.info(f"Cancelling scrape job {job.id}, its client disconnected")
+            self.cancel(job.id)
+
+    def get_batch(self, batch_id: str) -> Batch | None:
+        return self.batches.get(batch_id)
+
+    def _existing(self, account: Account, idempotency_key: str | None) -> Job | None:
+        if idempotency_key and (job := self._by_idempotency_key.get(idempotency_key)):
+            return job
+        if (job := self._running_by_account.get(coalescing_key(account))) and not job.cancelled:
+            return job
+        return None
+
+    def _register(self, job: Job, idempotency_key: str | None) -> None:
+        self.jobs[job.id] = job
+        self._running_by_account[coalescing_key(job.account)] = job
+        if idempotency_key:
+            self._by_idempotency_key[idempotency_key] = job
+
+    def _group_recorder(self, job: Job, account: Account) -> Callable[[str, List[Lead]], None]:
+        groups = {group.group_link: group for group in account.groups}
+
+        def record(group_link: str, leads: List[Lead]) -> None:
+            # Partial leads of a group cut short by the deadline would later pass for a complete answer.
+            if group_link not in job.context.truncated_groups:
+                self.cache.put(account.username, groups[group_link], leads)
+            job.record_group(group_link, leads)
+
+        return record
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, jobs: List[Job], concurrency: int, deadline_seconds: float) -> None:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(job: Job) -> None:
+            async with semaphore:
+                if job.cancelled:
+                    job.finish("cancelled")
+                    self._forget_running(job)
+                    return
+                job.context.deadline = Deadline(deadline_seconds)
+                # Batch jobs wait for executor capacity instead of being rejected.
+                while True:
+                    await self.executor.make_room()
+                    try:
+                        future = self.executor.submit(
+                            job.account, job.mark_started, self._group_recorder(job, job.account), job.context
+                        )
+                        break
+                    except ExecutorFull:
+                        await asyncio.sleep(settings.BATCH_RETRY_INTERVAL)
+                await self._run(job, future)
+
+        await asyncio.gather(*(run(job) for job in jobs))
+
+    async def _run(self, job: Job, future: asyncio.Future, scrape_account: Account | None = None) -> None:
+        try:
+            await future
+            if scrape_account is not None and scrape_account is not job.account:
+                job.account.new_cookies = scrape_account.new_cookies
+        except ScrapeCancelled:
+            logger.info(f"Scrape job {job.id} for {job.account.username} was cancelled")
+            job.finish("cancelled")
+        except asyncio.CancelledError:
+            # Shutting down: stop the scrape's thread or worker at its next wait too.
+            job.cancel()
+            job.finish("cancelled")
+            raise
+        except Exception as e:
+            logger.exception(f"Scrape job {job.id} for {job.account.username} failed")
+            job.finish("failed", repr(e))
+        else:
+            job.finish("done")
+        finally:
+            self._forget_running(job)
+
+    def _forget_running(self, job: Job) -> None:
+        if self._running_by_account.get(coalescing_key(job.account)) is job:
+            del self._running_by_account[coalescing_key(job.account)]
+
+    def _prune(self) -> None:
+        expires = time.time() - settings.JOB_TTL
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.finished and job.finished_at < expires]:
+            del self.jobs[job_id]
+        for key in [key for key, job in self._by_idempotency_key.items() if job.id not in self.jobs]:
+            del self._by_idempotency_key[key]
+        for batch_id in [batch_id for batch_id, batch in self.batches.items() if batch.finished]:
+            if all(job.id not in self.jobs for job in self.batches[batch_id].jobs):
+                del self.batches[batch_id]
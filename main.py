@@ -1,17 +1,223 @@
-from fastapi import FastAPI, Request
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 import asyncio
 
+from cache import ResultCache
+from drivers import DriverPool, DriverSpec, WebDriverManager
+from executors import ExecutorFull, ProcessScrapeExecutor, ScrapeExecutor
+from jobs import Job, JobQueue
+from models import BatchScrapeRequest, ScrapeRequest
 from scrapper import Scrapper
+from settings import settings
+from utils import Deadline
+
+logger = logging.getLogger(__name__)
+
+driver_pool = DriverPool()
+result_cache = ResultCache()
+
+
+def create_executor() -> ScrapeExecutor:
+    if settings.SCRAPE_EXECUTOR == "process":
+        return ProcessScrapeExecutor()
+    return ScrapeExecutor(Scrapper(driver_pool))
+
+
+def prewarm_drivers() -> None:
+    if settings.SCRAPE_EXECUTOR == "process":
+        # Worker processes own their drivers; a pool in the API process would never be used.
+        return
+
+    for proxy_url in settings.PREWARM_PROXY_URLS:
+        spec = DriverSpec(proxy_url=proxy_url)
+        started = driver_pool.prewarm(spec, settings.PREWARM_DRIVERS)
+        logger.info(f"Prewarmed {started}/{settings.PREWARM_DRIVERS} drivers for {proxy_url.split('@')[-1]}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.ready = False
+    WebDriverManager.check_modes()
+    await asyncio.to_thread(prewarm_drivers)
+    if settings.SCRAPE_EXECUTOR != "process":
+        driver_pool.start_maintenance()
+    app.state.executor = await asyncio.to_thread(create_executor)
+    app.state.jobs = JobQueue(app.state.executor, result_cache)
+    app.state.ready = True
+
+    yield
+
+    app.state.ready = False
+    await app.state.jobs.stop()
+    await asyncio.to_thread(app.state.executor.shutdown)
+    await asyncio.to_thread(driver_pool.close)
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.exception_handler(ExecutorFull)
+async def executor_full(request: Request, exc: ExecutorFull):
+    """Backpressure: tell clients when capacity is expected back instead of queueing past what the box holds."""
+    return JSONResponse(
+        {"detail": str(exc), "retry_after": exc.retry_after},
+        status_code=429,
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+def request_deadline(payload_seconds: float | None, request: Request) -> Deadline:
+    """The payload's ``deadline_seconds``, else the ``X-Deadline-Seconds`` header, else the default."""
+    seconds = payload_seconds
+    if seconds is None and (header := request.headers.get("X-Deadline-Seconds")):
+        try:
+            seconds = float(header)
+        except ValueError:
+            raise HTTPException(status_code=422, detail="X-Deadline-Seconds must be a number")
+        if seconds <= 0:
+            raise HTTPException(status_code=422, detail="X-Deadline-Seconds must be positive")
+    return Deadline(seconds if seconds is not None else settings.SCRAPE_DEADLINE)
+
+
+@app.get("/health")
+async def health(request: Request):
+    if not request.app.state.ready:
+        return JSONResponse({"ready": False}, status_code=503)
+    return {
+        "ready": True,
+        "drivers": driver_pool.stats(),
+        "scrapes": request.app.state.executor.stats(),
+        "result_cache": result_cache.stats(),
+    }
+
+
+@app.post("/scrape", status_code=202)
+async def scrape(payload: ScrapeRequest, request: Request):
+    job, created = await request.app.state.jobs.submit(
+        payload.account,
+        idempotency_key=request.headers.get("Idempotency-Key"),
+        max_cache_age=payload.max_cache_age,
+        deadline=request_deadline(payload.deadline_seconds, request),
+    )
+
+    if job.finished:
+        # Answered from the result cache (or a finished idempotent request): no need to poll.
+        return {**job.to_dict(), "coalesced": not created}
+
+    if created:
+        logger.info(f"Queued scrape job {job.id} for {payload.account.username}")
+    return {"job_id": job.id, "status": job.status, "coalesced": not created, "cache_age": job.cache_ages}
+
+
+async def next_event(events: asyncio.Queue, request: Request) -> tuple | None:
+    """The job's next event, or None once the client has disconnected while waiting for it."""
+    while True:
+        try:
+            return await asyncio.wait_for(events.get(), settings.DISCONNECT_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            if await request.is_disconnected():
+                return None
+
+
+async def stream_job(job: Job, events: asyncio.Queue, per_lead: bool, request: Request) -> AsyncIterator[Dict]:
+    yield {"event": "job", "job_id": job.id}
+
+    try:
+        while (event := await next_event(events, request)) and event[0] != "end":
+            group_link, leads = event[1]
+            if per_lead:
+                for lead in leads:
+                    yield {"event": "lead", "group_link": group_link, "lead": lead}
+            else:
+                yield {
+                    "event": "group",
+                    "group_link": group_link,
+                    "leads": leads,
+                    "cache_age": job.cache_ages.get(group_link),
+                    "truncated": group_link in job.context.truncated_groups,
+                    "scroll_metrics": job.context.scroll_metrics.get(group_link),
+                }
+    finally:
+        job.unsubscribe(events)
+
+    if event is None:
+        return
+
+    summary = job.to_dict()
+    fields = (
+        "status",
+        "error",
+        "groups_done",
+        "cache_age",
+        "truncated",
+        "truncated_groups",
+        "scroll_metrics",
+        "new_cookies",
+        "timings",
+    )
+    yield {"event": "done", **{key: summary[key] for key in fields}}
+
+
+@app.post("/scrape/stream")
+async def scrape_stream(payload: ScrapeRequest, request: Request, per_lead: bool = False):
+    """Streams leads as groups finish: NDJSON, or Server-Sent Events when the client accepts them."""
+    job, _ = await request.app.state.jobs.submit(
+        payload.account,
+        polled=False,
+        idempotency_key=request.headers.get("Idempotency-Key"),
+        max_cache_age=payload.max_cache_age,
+        deadline=request_deadline(payload.deadline_seconds, request),
+    )
+
+    events = job.subscribe()
+    sse = "text/event-stream" in request.headers.get("accept", "")
+
+    async def body() -> AsyncIterator[str]:
+        try:
+            async for event in stream_job(job, events, per_lead, request):
+                data = json.dumps(jsonable_encoder(event))
+                yield f"event: {event['event']}\ndata: {data}\n\n" if sse else f"{data}\n"
+        finally:
+            # A client that went away mid-stream shouldn't keep a browser busy for nobody.
+            request.app.state.jobs.release(job)
+
+    return StreamingResponse(body(), media_type="text/event-stream" if sse else "application/x-ndjson")
+
+
+@app.post("/scrape/batch", status_code=202)
+async def scrape_batch(payload: BatchScrapeRequest, request: Request):
+    deadline_seconds = payload.deadline_seconds or settings.SCRAPE_DEADLINE
+    batch = request.app.state.jobs.submit_batch(payload.accounts, payload.concurrency, deadline_seconds)
+    logger.info(f"Queued batch {batch.id} with {len(batch.jobs)} accounts")
+    return {"batch_id": batch.id, "job_ids": [job.id for job in batch.jobs]}
+
+
+@app.get("/batches/{batch_id}")
+async def get_batch(batch_id: str, request: Request):
+    if not (batch := request.app.state.jobs.get_batch(batch_id)):
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return batch.to_dict()
+
 
-app = FastAPI()
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, request: Request):
+    if not (job := request.app.state.jobs.get(job_id)):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
 
 
-@app.post("/scrape")
-async def scrape(request: Request):
-    data = await request.json()
-    account = data.get("account")
-    print(account, 'status active')
-    return {"account": account}
-    # scrapper = Scrapper()
-    # recent_posts = await asyncio.to_thread(scrapper.get_new_posts, account)
-    # return {"account": account, "recent_posts": recent_posts}
+@app.delete("/jobs/{job_id}", status_code=202)
+async def cancel_job(job_id: str, request: Request):
+    """Stops the scrape at its next wait; poll the job until its status turns ``cancelled``."""
+    if not (job := request.app.state.jobs.get(job_id)):
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.finished:
+        raise HTTPException(status_code=409, detail=f"Job already {job.status}")
+    request.app.state.jobs.cancel(job_id)
+    return job.to_dict()
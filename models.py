@@ -0,0 +1,35 @@
+from pydantic import BaseModel, Field
+
+from settings import LaunchProfileName, settings
+
+
+class Group(BaseModel):
+    group_link: str
+    last_post_link: str | None = None
+
+
+class Account(BaseModel):
+    username: str
+    password: str
+    proxy_url: str
+    cookies: list[dict] = []
+    groups: list[Group]
+    launch_profile: LaunchProfileName | None = None
+    # Set by Scrapper.handle_login when it had to log in again.
+    new_cookies: list[dict] | None = None
+
+
+class ScrapeRequest(BaseModel):
+    account: Account
+    # Groups scraped less than this many seconds ago are answered from the result cache.
+    max_cache_age: float = Field(default=0, ge=0)
+    # End-to-end budget counted from the request's arrival; groups still running past it come back partial.
+    deadline_seconds: float | None = Field(default=None, gt=0)
+
+
+class BatchScrapeRequest(BaseModel):
+    accounts: list[Account] = Field(min_length=1, max_length=settings.MAX_BATCH_SIZE)
+    # How many of the batch's accounts may be scraped at the same time.
+    concurrency: int = Field(default=settings.BATCH_CONCURRENCY, ge=1)
+    # Budget of each account's scrape, counted from when it starts rather than from the batch's arrival.
+    deadline_seconds: float | None = Field(default=None, gt=0)
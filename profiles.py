@@ -0,0 +1,145 @@
+import contextlib
+import fcntl
+import logging
+import os
+import re
+import shutil
+import time
+from dataclasses import dataclass
+from typing import IO, List
+
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ProfileBusyError(RuntimeError):
+    pass
+
+
+@dataclass
+class ProfileLease:
+    key: str
+    path: str
+    lock_file: IO
+
+
+class ProfileStore:
+    """Persistent ``--user-data-dir`` profiles, one per account.
+
+    A profile is guarded by an exclusive ``flock`` on ``<key>.lock``, which holds across threads and
+    worker processes alike, so two browsers never open the same profile.
+    """
+
+    # Directories Chrome rebuilds on demand; dropping them keeps cookies and local storage intact.
+    cache_dirs = (
+        "Default/Cache",
+        "Default/Code Cache",
+        "Default/GPUCache",
+        "Default/Service Worker/CacheStorage",
+        "Default/Service Worker/ScriptCache",
+        "GrShaderCache",
+        "ShaderCache",
+        "component_crx_cache",
+        "optimization_guide_model_store",
+    )
+
+    def __init__(
+        self,
+        base_dir: str,
+        max_profile_mb: int = settings.CHROME_PROFILE_MAX_MB,
+        max_idle_days: float = settings.CHROME_PROFILE_MAX_IDLE_DAYS,
+        lock_timeout: float = settings.CHROME_PROFILE_LOCK_TIMEOUT,
+    ):
+        self.base_dir = base_dir
+        self.max_profile_bytes = max_profile_mb * 1024 * 1024
+        self.max_idle_seconds = max_idle_days * 24 * 3600
+        self.lock_timeout = lock_timeout
+        self._last_cleanup = 0.0
+
+        os.makedirs(base_dir, exist_ok=True)
+
+    def acquire(self, key: str) -> ProfileLease:
+        self.cleanup_if_due()
+
+        name = self._safe_name(key)
+        lock_file = open(os.path.join(self.base_dir, f"{name}.lock"), "a")
+        deadline = time.monotonic() + self.lock_timeout
+
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    lock_file.close()
+                    raise ProfileBusyError(f"Chrome profile for {key} is in use")
+                time.sleep(0.5)
+
+        path = os.path.join(self.base_dir, name)
+        os.makedirs(path, exist_ok=True)
+        os.utime(path)
+        return ProfileLease(key=key, path=path, lock_file=lock_file)
+
+    def release(self, lease: ProfileLease) -> None:
+        """Call only after the browser using the profile has quit."""
+        try:
+            if self.disk_usage(lease.path) > self.max_profile_bytes:
+                self.compact(lease.path)
+        finally:
+            fcntl.flock(lease.lock_file, fcntl.LOCK_UN)
+            lease.lock_file.close()
+
+    def compact(self, path: str) -> None:
+        before = self.disk_usage(path)
+        for cache_dir in self.cache_dirs:
+            shutil.rmtree(os.path.join(path, cache_dir), ignore_errors=True)
+        logger.info(f"Compacted Chrome profile {path}: {before >> 20} MB -> {self.disk_usage(path) >> 20} MB")
+
+    def cleanup_if_due(self) -> None:
+        if time.monotonic() - self._last_cleanup > 3600:
+            self._last_cleanup = time.monotonic()
+            self.cleanup()
+
+    def cleanup(self) -> List[str]:
+        """Remove profiles nobody has used for ``max_idle_days``; locked profiles are skipped."""
+        removed: List[str] = []
+        now = time.time()
+
+        for entry in os.scandir(self.base_dir):
+            if not entry.is_dir() or now - entry.stat().st_mtime < self.max_idle_seconds:
+                continue
+
+            with open(os.path.join(self.base_dir, f"{entry.name}.lock"), "a") as lock_file:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue
+                shutil.rmtree(entry.path, ignore_errors=True)
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+            # The lock file stays: an acquire may already have it open, and would lock an unlinked inode
+            # while the next acquire locks a new file, both browsers then opening the same profile.
+            removed.append(entry.name)
+
+        if removed:
+            logger.info(f"Removed {len(removed)} idle Chrome profiles")
+        return removed
+
+    @staticmethod
+    def disk_usage(path: str) -> int:
+        total = 0
+        for root, _, files in os.walk(path):
+            for file in files:
+                with contextlib.suppress(OSError):
+                    total += os.lstat(os.path.join(root, file)).st_size
+        return total
+
+    @staticmethod
+    def _safe_name(key: str) -> str:
+        return re.sub(r"[^A-Za-z0-9_.-]", "_", key)
+
+
+profile_store: ProfileStore | None = (
+    ProfileStore(settings.CHROME_PROFILES_DIR) if settings.CHROME_PROFILES_DIR else None
+)
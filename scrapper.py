@@ -2,10 +2,10 @@ import contextlib
 import logging
 import os
 import time
+from dataclasses import dataclass, field, replace
 from secrets import SystemRandom
-from typing import Dict, List
+from typing import Any, Callable, ContextManager, Dict, Generator, List, Tuple
 
-import seleniumwire.undetected_chromedriver as webdriver
 from bs4 import BeautifulSoup, Tag
 from selenium.common.exceptions import (
     ElementClickInterceptedException,
@@ -13,8 +13,8 @@ from selenium.common.exceptions import (
     NoSuchElementException,
     StaleElementReferenceException,
     TimeoutException,
+    WebDriverException,
 )
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.webdriver import WebDriver
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.common.by import By
@@ -22,47 +22,170 @@ from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support import expected_conditions as EC  # noqa: N812
 from selenium.webdriver.support.ui import WebDriverWait
 
-logger = logging.getLogger(__name__)
-
-
-class WebDriverManager:
-    def __init__(self, proxy_url: str):
-        selenium_options = {
-            "proxy": {
-                "http": proxy_url,
-            }
-        }
-
-        self.driver = webdriver.Chrome(
-            options=self._init_options(),
-            seleniumwire_options=selenium_options,
-            version_main=112,
-            driver_executable_path="/usr/lib/chromium/chromedriver",
-        )
-
-        self.driver.implicitly_wait(4)
-        self.proxy = proxy_url
-        self.proxy_ip = proxy_url.split("@")[-1].split(":")[0]
+from drivers import DriverPool, DriverSpec, WebDriverManager, prepare_new_tab, record_usage
+from settings import settings
+from utils import CancellationToken, Deadline, DeadlineExceeded
 
-    def __enter__(self) -> WebDriver:
-        st = self.driver.execute_script("return navigator.webdriver")
-        assert not st
-        return self.driver
-
-    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
-        self.driver.quit()
+logger = logging.getLogger(__name__)
 
-    def _init_options(self) -> Options:
-        options = Options()
-        options.add_argument("--headless")
-        options.add_argument("--disable-gpu")
-        options.add_argument("--np-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
-        options.add_argument("--ignore-ssl-errors=yes")
-        options.add_argument("--ignore-certificate-errors")
-        options.add_argument("--blink-settings=imagesEnabled=false")
-        options.add_argument("--disable-notifications")
-        return options
+Steps = Generator["tuple | WaitFor", None, Any]
+GroupCallback = Callable[[str, List["Lead"]], None]
+
+# Number of articles in the feed and the feed's height, to notice new content after a scroll.
+FEED_SIZE_SCRIPT = """
+const feed = document.querySelector("div[role=feed]");
+return feed ? [feed.querySelectorAll("div[role=article]").length, feed.scrollHeight] : [0, 0];
+"""
+# Scrolls the feed's last rendered entry into view, which makes Facebook load the next ones, and returns the
+# feed size from before the scroll.
+SCROLL_TO_LAST_ARTICLE_SCRIPT = """
+const feed = document.querySelector("div[role=feed]");
+if (!feed) {
+    window.scrollTo(0, document.body.scrollHeight);
+    return [0, 0];
+}
+const size = [feed.querySelectorAll("div[role=article]").length, feed.scrollHeight];
+(feed.lastElementChild || feed).scrollIntoView({block: "end"});
+return size;
+"""
+
+
+@dataclass(frozen=True)
+class Lead:
+    post_text: str | None
+    user_link: str | None
+    post_link: str | None
+
+
+# Clicks every visible "See original" and "See more" button not clicked before, in one round trip; returns how many.
+EXPAND_POSTS_SCRIPT = """
+const labels = ["See original", "See more"];
+let clicked = 0;
+for (const label of labels) {
+    for (const button of document.querySelectorAll("div[role=button]:not([data-scrapper-expanded])")) {
+        const ownText = Array.from(button.childNodes).some(node => node.nodeType === 3 && node.nodeValue === label);
+        if (!ownText || !button.getClientRects().length) continue;
+        button.setAttribute("data-scrapper-expanded", "");
+        button.click();
+        clicked++;
+    }
+}
+return clicked;
+"""
+
+# Hovers, with synthetic pointer and mouse events, the links still waiting for their permalink in articles not read
+# yet (see NEW_ARTICLES_SCRIPT), which makes Facebook fill them in. A link that didn't resolve is hovered again on the
+# next call. Returns how many links it hovered.
+HOVER_POST_LINKS_SCRIPT = """
+const types = ["pointerover", "pointerenter", "mouseover", "mouseenter", "mousemove"];
+let hovered = 0;
+for (const link of document.querySelectorAll(
+    "div[role=feed] div[role=article]:not([data-scrapper-extracted]) a[href='#']"
+)) {
+    const rect = link.getBoundingClientRect();
+    for (const type of types) {
+        const EventType = type.startsWith("pointer") ? PointerEvent : MouseEvent;
+        link.dispatchEvent(new EventType(type, {
+            bubbles: !type.endsWith("enter"),
+            cancelable: true,
+            view: window,
+            clientX: rect.x + rect.width / 2,
+            clientY: rect.y + rect.height / 2,
+        }));
+    }
+    hovered++;
+}
+return hovered;
+"""
+
+FEED_HTML_SCRIPT = """
+const feed = document.querySelector("div[role=feed]");
+return feed ? feed.outerHTML : null;
+"""
+# The HTML of the feed's posts not returned before, or null when the feed has no numbered posts. Posts still waiting
+# for a permalink or a "See more" expansion come back again on the next call.
+NEW_ARTICLES_SCRIPT = """
+const selector = "div[role=feed] div[role=article][aria-posinset]";
+if (!document.querySelector(selector)) return null;
+return Array.from(document.querySelectorAll(selector + ":not([data-scrapper-extracted])"), article => {
+    const html = article.outerHTML;
+    const settled = !article.querySelector("a[href='#']")
+        && !Array.from(article.querySelectorAll("div[role=button]")).some(button => button.textContent === "See more");
+    if (settled) article.setAttribute("data-scrapper-extracted", "");
+    return html;
+});
+"""
+
+
+@dataclass
+class ScrollMetrics:
+    """How a group's scroll loop went; ``stop_reason`` is enough_posts, exhausted or deadline."""
+
+    scrolls: int = 0
+    articles: int = 0
+    new_articles: List[int] = field(default_factory=list)
+    stagnant_steps: int = 0
+    # "See more" and "See original" buttons clicked, placeholder post links hovered.
+    expanded: int = 0
+    hovered: int = 0
+    # HTML transferred from the browser and parsed.
+    html_bytes: int = 0
+    stop_reason: str | None = None
+    seconds: float = 0.0
+
+    def record_step(self, before: List[int], after: List[int]) -> None:
+        self.scrolls += 1
+        self.articles = after[0]
+        self.new_articles.append(after[0] - before[0])
+        # The height also counts: a growing feed may only be filling in placeholders.
+        self.stagnant_steps = 0 if after[0] > before[0] or after[1] != before[1] else self.stagnant_steps + 1
+
+
+@dataclass
+class ScrapeContext:
+    """Per-scrape state passed down into the steps; picklable so it can cross into a worker process."""
+
+    deadline: Deadline = field(default_factory=Deadline)
+    cancellation: CancellationToken = field(default_factory=CancellationToken)
+    # Groups whose scroll loop (or page load) was cut short by the deadline; their leads are partial.
+    truncated_groups: List[str] = field(default_factory=list)
+    scroll_metrics: Dict[str, ScrollMetrics] = field(default_factory=dict)
+
+    @property
+    def truncated(self) -> bool:
+        return bool(self.truncated_groups)
+
+    def share(self, parts: int) -> "ScrapeContext":
+        """The same scrape with an equal share of the remaining deadline, for one of ``parts`` groups."""
+        return replace(self, deadline=self.deadline.share(parts))
+
+    def sleep(self, seconds: float) -> None:
+        """Sleep no further than the deadline; raises ``ScrapeCancelled`` as soon as the scrape is cancelled."""
+        self.cancellation.wait(self.deadline.clamp(seconds))
+        self.cancellation.check()
+
+
+@dataclass
+class WaitFor:
+    """A step's request to resume once ``ready()`` holds, but not before ``floor`` nor after ``timeout`` seconds."""
+
+    ready: Callable[[], bool]
+    timeout: float
+    floor: float = 0.0
+    started_at: float = field(default_factory=time.monotonic)
+
+    def done(self) -> bool:
+        elapsed = time.monotonic() - self.started_at
+        return elapsed >= self.timeout or (elapsed >= self.floor and self.ready())
+
+
+@dataclass
+class _Tab:
+    handle: str
+    group: Any
+    steps: Steps
+    ready_at: float = 0.0
+    waiting_for: WaitFor | None = None
 
 
 class Scrapper:
@@ -71,69 +194,270 @@ class Scrapper:
     cookie = "Decline optional cookies"
     login_msg = "You must log in to continue."
 
-    def __init__(self) -> None:
+    def __init__(self, pool: DriverPool | None = None) -> None:
         self.rand_generator = SystemRandom()
+        self.pool = pool
+
+    def get_new_posts(
+        self, account, on_group: GroupCallback | None = None, context: ScrapeContext | None = None
+    ) -> Dict[str, List]:
+        """``on_group(group_link, new_posts)`` is called as soon as each group is done.
+
+        The context's deadline is split evenly across the groups still to scrape; groups that run out of
+        budget return what they found so far and are listed in ``context.truncated_groups``. Cancelling the
+        context raises ``ScrapeCancelled`` at the next wait.
+        """
+        context = context or ScrapeContext()
+        new_posts: Dict[str, List] = {}
+        # Cancelled while queued: don't even lease a browser.
+        context.cancellation.check()
+
+        with self.driver_session(account) as driver:
+            try:
+                self.handle_authorization(account, driver, context)
+            except DeadlineExceeded:
+                logger.warning(f"Deadline reached while authorizing {account.username}")
+                context.truncated_groups += [group.group_link for group in account.groups]
+                return new_posts
+
+            if settings.MULTI_TAB_GROUPS and len(account.groups) > 1:
+                return self.get_new_posts_in_tabs(driver, account.groups, on_group, context)
+
+            for index, group in enumerate(account.groups):
+                group_context = context.share(len(account.groups) - index)
+                posts: List[Lead] = self.get_feed_posts(driver, group, 8, group_context)
+                new_posts[group.group_link] = self.get_new_posts_from_recent([post for post in posts], group)
+                if on_group:
+                    on_group(group.group_link, new_posts[group.group_link])
 
-    def get_new_posts(self, account) -> Dict[str, List]:
+        return new_posts
+
+    def get_new_posts_in_tabs(
+        self,
+        driver: WebDriver,
+        groups: list,
+        on_group: GroupCallback | None = None,
+        context: ScrapeContext | None = None,
+    ) -> Dict[str, List]:
+        """Scrape groups in separate tabs of one browser, running one tab's steps while the others wait.
+
+        Tabs run side by side, so each of them gets the whole remaining deadline.
+        """
+        context = context or ScrapeContext()
         new_posts: Dict[str, List] = {}
+        pending = list(groups)
+        tabs: List[_Tab] = []
+        main_handle = driver.current_window_handle
 
-        with WebDriverManager(account.proxy_url) as driver:
-            self.handle_authorization(account, driver)
+        try:
+            for index in range(min(settings.MAX_TABS, len(pending))):
+                if index:
+                    driver.switch_to.new_window("tab")
+                    prepare_new_tab(driver)
+                group = pending.pop(0)
+                tabs.append(_Tab(driver.current_window_handle, group, self.feed_steps(driver, group, 8, context)))
+
+            while tabs:
+                tab = min(tabs, key=lambda t: t.ready_at)
+                context.sleep(max(0.0, tab.ready_at - time.monotonic()))
+
+                driver.switch_to.window(tab.handle)
+                if tab.waiting_for and not (tab.waiting_for.done() or context.deadline.expired):
+                    tab.ready_at = time.monotonic() + settings.FEED_POLL_INTERVAL
+                    continue
 
-            for group in account.groups:
-                posts: List[Tag] = self.get_feed_posts(driver, group, 8)
-                new_posts[group.group_link] = self.get_new_posts_from_recent([post for post in posts], group)
+                try:
+                    wait = next(tab.steps)
+                    if isinstance(wait, WaitFor):
+                        tab.waiting_for, delay = wait, wait.floor
+                    else:
+                        tab.waiting_for, delay = None, self.sample_wait(*wait)
+                    tab.ready_at = time.monotonic() + context.deadline.clamp(delay)
+                    continue
+                except StopIteration as stop:
+                    new_posts[tab.group.group_link] = self.get_new_posts_from_recent(stop.value, tab.group)
+                    if on_group:
+                        on_group(tab.group.group_link, new_posts[tab.group.group_link])
+
+                if pending:
+                    group = pending.pop(0)
+                    tabs[tabs.index(tab)] = _Tab(tab.handle, group, self.feed_steps(driver, group, 8, context))
+                else:
+                    tabs.remove(tab)
+                    if tab.handle != main_handle:
+                        driver.close()
+        finally:
+            # Also when a group fails or the scrape is cancelled: the driver may go back to the pool. A browser
+            # that died raises again here; the pool discards it anyway, so keep the original error.
+            with contextlib.suppress(WebDriverException):
+                self.close_other_tabs(driver, main_handle)
 
         return new_posts
 
-    def get_feed_posts(self, driver: WebDriver, group, at_least_posts: int) -> List:
-        self.load_group_page(driver, group)
+    def close_other_tabs(self, driver: WebDriver, main_handle: str) -> None:
+        for handle in driver.window_handles:
+            if handle != main_handle:
+                driver.switch_to.window(handle)
+                driver.close()
+        driver.switch_to.window(main_handle)
+
+    def driver_session(self, account) -> ContextManager[WebDriver]:
+        spec = DriverSpec.for_account(account)
+        if self.pool:
+            return self.pool.lease(spec)
+        return WebDriverManager.from_spec(spec)
+
+    def get_feed_posts(
+        self, driver: WebDriver, group, at_least_posts: int, context: ScrapeContext | None = None
+    ) -> List[Lead]:
+        return self.run_steps(self.feed_steps(driver, group, at_least_posts, context), context)
+
+    def feed_steps(self, driver: WebDriver, group, at_least_posts: int, context: ScrapeContext | None = None) -> Steps:
+        """The feed scrape as a generator: yields ``wait`` arguments instead of sleeping, returns the leads.
+
+        Scrolls to the last rendered article each step and stops once ``FEED_MAX_STAGNANT_STEPS`` steps in a row
+        added nothing. Past the context's deadline it returns the leads found so far and records the group as
+        truncated. How it went ends up in ``context.scroll_metrics``.
+        """
+        context = context or ScrapeContext()
+        metrics = context.scroll_metrics[group.group_link] = ScrollMetrics()
+        started_at = time.monotonic()
+
+        try:
+            yield from self.group_page_steps(driver, group, context)
+        except DeadlineExceeded:
+            logger.warning(f"Deadline reached while loading {group.group_link}")
+            context.truncated_groups.append(group.group_link)
+            metrics.stop_reason = "deadline"
+            return []
         driver.find_element(By.TAG_NAME, "body").send_keys(Keys.ESCAPE)
 
-        scroll_position = 1
-        recent_leads: List = []
+        recent_leads: List[Lead] = []
 
         while True:
-            driver.execute_script(f"window.scrollTo(0, {scroll_position} * document.body.scrollHeight/6);")
-            self.wait(4, 1)
+            feed_size = driver.execute_script(SCROLL_TO_LAST_ARTICLE_SCRIPT)
+            record_usage(driver, scrolls=1)
+            # Carry on as soon as the feed grows; the optional floor keeps the pacing human-like.
+            yield WaitFor(
+                lambda: self.feed_size(driver) != feed_size,
+                timeout=settings.FEED_WAIT_TIMEOUT,
+                floor=self.sample_wait(settings.FEED_WAIT_FLOOR, settings.FEED_WAIT_JITTER),
+            )
+            metrics.record_step(feed_size, self.feed_size(driver))
+            metrics.seconds = time.monotonic() - started_at
 
-            see_original = driver.find_elements(By.XPATH, "//div[text()='See original' and @role='button']")
-            for el in see_original:
-                with contextlib.suppress(
-                        StaleElementReferenceException, ElementClickInterceptedException, TimeoutException
-                ):
-                    WebDriverWait(driver, 5).until(EC.element_to_be_clickable(el)).click()
+            metrics.expanded += self.expand_posts(driver)
+
+            metrics.hovered += self.hover_post_links(driver)
+
+            articles, html_bytes = self.extract_articles(driver)
+            metrics.html_bytes += html_bytes
+            logger.debug(f"Extracted {html_bytes} bytes of HTML from {group.group_link} on scroll {metrics.scrolls}")
+
+            recent_leads += [self.get_lead_from_feed_post(post) for post in articles if self._is_valid_post(post)]
+            # One lead per post, at its first position but with the latest text (after "See more" was expanded).
+            recent_leads = list(
+                {lead.post_link: lead for lead in recent_leads if lead.user_link and lead.post_link}.values()
+            )
+
+            if len(recent_leads) >= at_least_posts:
+                metrics.stop_reason = "enough_posts"
+                return recent_leads
+            elif context.deadline.expired:
+                logger.warning(f"Deadline reached in {group.group_link} with {len(recent_leads)} leads")
+                context.truncated_groups.append(group.group_link)
+                metrics.stop_reason = "deadline"
+                return recent_leads
+            elif metrics.stagnant_steps >= settings.FEED_MAX_STAGNANT_STEPS:
+                logger.info(f"Feed of {group.group_link} exhausted after {metrics.scrolls} scrolls")
+                metrics.stop_reason = "exhausted"
+                return recent_leads
 
-            see_more = driver.find_elements(By.XPATH, "//div[text()='See more' and @role='button']")
-            for el in see_more:
+    def expand_posts(self, driver: WebDriver) -> int:
+        """Click the "See original" and "See more" buttons of the feed; returns how many were clicked."""
+        try:
+            return driver.execute_script(EXPAND_POSTS_SCRIPT)
+        except WebDriverException:
+            logger.warning("Expanding posts in the page failed, clicking the buttons one by one", exc_info=True)
+            return self.expand_posts_one_by_one(driver)
+
+    def expand_posts_one_by_one(self, driver: WebDriver) -> int:
+        clicked = 0
+        for label in ("See original", "See more"):
+            for el in driver.find_elements(By.XPATH, f"//div[text()='{label}' and @role='button']"):
                 with contextlib.suppress(
                         StaleElementReferenceException, ElementClickInterceptedException, TimeoutException
                 ):
                     WebDriverWait(driver, 5).until(EC.element_to_be_clickable(el)).click()
+                    clicked += 1
+        return clicked
 
-            post_links = driver.find_elements(By.XPATH, "//a[@href='#']")
-            for post_link in post_links:
-                with contextlib.suppress(ElementNotInteractableException, StaleElementReferenceException):
-                    ActionChains(driver).move_to_element(post_link).perform()
-
-            soup = BeautifulSoup(driver.page_source, "html.parser")
+    def hover_post_links(self, driver: WebDriver) -> int:
+        """Hover the placeholder post links of new articles so they get their permalinks; returns how many."""
+        if settings.POST_LINK_HOVER == "actions":
+            return self.hover_post_links_with_actions(driver)
+        try:
+            return driver.execute_script(HOVER_POST_LINKS_SCRIPT)
+        except WebDriverException:
+            logger.warning("Hovering post links in the page failed, moving the mouse to each one", exc_info=True)
+            return self.hover_post_links_with_actions(driver)
+
+    def hover_post_links_with_actions(self, driver: WebDriver) -> int:
+        hovered = 0
+        for post_link in driver.find_elements(By.XPATH, "//a[@href='#']"):
+            with contextlib.suppress(ElementNotInteractableException, StaleElementReferenceException):
+                ActionChains(driver).move_to_element(post_link).perform()
+                hovered += 1
+        return hovered
+
+    def extract_articles(self, driver: WebDriver) -> Tuple[List[Tag], int]:
+        """The feed's articles, fetched as FEED_EXTRACTION says, and how many bytes of HTML that took."""
+        if settings.FEED_EXTRACTION == "new_articles":
+            if (fragments := driver.execute_script(NEW_ARTICLES_SCRIPT)) is not None:
+                articles = [BeautifulSoup(html, "html.parser").find("div", {"role": "article"}) for html in fragments]
+                return articles, sum(len(html.encode()) for html in fragments)
+            # No numbered posts to pick out: take the whole feed this time.
+
+        html = None
+        if settings.FEED_EXTRACTION != "page":
+            html = driver.execute_script(FEED_HTML_SCRIPT)
+        if html is None:
+            html = driver.page_source
+
+        soup = BeautifulSoup(html, "html.parser")
+        return soup.find("div", {"role": "feed"}).find_all("div", {"role": "article"}), len(html.encode())
+
+    def feed_size(self, driver: WebDriver) -> List[int]:
+        return driver.execute_script(FEED_SIZE_SCRIPT)
+
+    def run_steps(self, steps: Steps, context: ScrapeContext | None = None):
+        context = context or ScrapeContext()
+        while True:
+            try:
+                wait = next(steps)
+            except StopIteration as stop:
+                return stop.value
+            if isinstance(wait, WaitFor):
+                self.wait_for(wait, context)
+            else:
+                self.wait(*wait, context=context)
 
-            recent_leads += [
-                self.get_lead_from_feed_post(post)
-                for post in soup.find("div", {"role": "feed"}).find_all("div", {"role": "article"})
-                if self._is_valid_post(post)
-            ]
-            recent_leads = list(set([lead for lead in recent_leads if lead.user_link and lead.post_link]))
+    def wait_for(self, wait: WaitFor, context: ScrapeContext) -> None:
+        context.sleep(wait.floor)
+        while not (wait.done() or context.deadline.expired):
+            context.sleep(settings.FEED_POLL_INTERVAL)
 
-            if len(recent_leads) >= at_least_posts:
-                return recent_leads
-            else:
-                scroll_position += 1
+    def wait(self, at_least_wait: int = 5, default_time: int = 3, context: ScrapeContext | None = None) -> None:
+        seconds = self.sample_wait(at_least_wait, default_time)
+        if context:
+            context.sleep(seconds)
+        else:
+            time.sleep(seconds)
 
-    def wait(self, at_least_wait: int = 5, default_time: int = 3) -> None:
-        time.sleep(at_least_wait + default_time * self.rand_generator.random())
+    def sample_wait(self, at_least_wait: int = 5, default_time: int = 3) -> float:
+        return at_least_wait + default_time * self.rand_generator.random()
 
-    def get_lead_from_feed_post(self, feed_post: Tag):
+    def get_lead_from_feed_post(self, feed_post: Tag) -> Lead:
         user_link: str | None = None
         post_text: str | None = None
         post_link: str | None = None
@@ -141,7 +465,7 @@ class Scrapper:
         post_info = self._get_post_info(feed_post)
 
         if not post_info:
-            return {"post_text": post_text, "user_link": user_link, "post_link": post_link}
+            return Lead(post_text=post_text, user_link=user_link, post_link=post_link)
 
         user_info = self._get_user_info(post_info)
 
@@ -149,22 +473,41 @@ class Scrapper:
         post_link = self._get_post_link(user_info)
         post_text = self._get_post_text(post_info)
 
-        return {"post_text": post_text, "user_link": user_link, "post_link": post_link}
+        return Lead(post_text=post_text, user_link=user_link, post_link=post_link)
 
-    def handle_authorization(self, user, driver: WebDriver) -> None:
-        driver.get(settings.FB_MAIN_LINK)
+    def handle_authorization(self, user, driver: WebDriver, context: ScrapeContext | None = None) -> None:
+        """Raises ``DeadlineExceeded`` when the context's deadline runs out before the login is through."""
+        context = context or ScrapeContext()
+
+        # Only a profile belongs to one account; a pooled driver without one may come from another account.
+        if DriverSpec.for_account(user).profile and self.has_session(driver):
+            logger.info(f"Reusing browser session for {user.username}")
+            return
+
+        self.load_page(driver, settings.FB_MAIN_LINK, context)
 
         if user.cookies:
             self.add_cookie(user.cookies, driver)
 
-        self.wait()
+        self.wait(context=context)
+        context.deadline.check()
 
-        if new_cookies := self.handle_login(user, driver):
+        if new_cookies := self.handle_login(user, driver, context):
             logger.warning(f"Cookies were updated for {user.username}")
             user.new_cookies = new_cookies
 
             self.add_cookie(user.new_cookies, driver)
 
+    def has_session(self, driver: WebDriver) -> bool:
+        """True when the browser's persistent profile already holds a live login."""
+        cookies = driver.execute_cdp_cmd("Network.getAllCookies", {})["cookies"]
+        return any(
+            cookie["name"] == "c_user"
+            and cookie["domain"].endswith("facebook.com")
+            and (cookie.get("session") or cookie.get("expires", 0) > time.time())
+            for cookie in cookies
+        )
+
     def add_cookie(self, cookies: list[dict], driver: WebDriver) -> None:
         for cookie in cookies:
             if cookie["sameSite"] in ["unspecified", "no_restriction"]:
@@ -175,7 +518,9 @@ class Scrapper:
 
             driver.add_cookie(cookie)
 
-    def handle_login(self, user, driver: WebDriver) -> list[dict] | None:
+    def handle_login(self, user, driver: WebDriver, context: ScrapeContext | None = None) -> list[dict] | None:
+        context = context or ScrapeContext()
+
         with contextlib.suppress(NoSuchElementException):
             driver.find_element(By.XPATH, f"//button[@title='{self.cookie}']").click()
 
@@ -183,23 +528,58 @@ class Scrapper:
             driver.find_element(By.XPATH, f"//div[text()='{self.login_msg}']")
 
             driver.find_element(By.ID, "email").send_keys(user.username)
-            self.wait()
+            self.wait(context=context)
+            context.deadline.check()
             driver.find_element(By.ID, "pass").send_keys(user.password)
-            self.wait()
+            self.wait(context=context)
+            context.deadline.check()
 
             driver.find_element(By.ID, "loginbutton").click()
-            self.wait()
+            self.wait(context=context)
 
             return driver.get_cookies()
 
-    def load_group_page(self, driver: WebDriver, group) -> None:
-        while True:
-            driver.get(group.group_link)
-            self.wait()
+    def load_page(self, driver: WebDriver, url: str, context: ScrapeContext | None = None) -> None:
+        """``driver.get`` that gives up, with ``DeadlineExceeded``, when the deadline runs out first."""
+        deadline = context.deadline if context else Deadline()
+        if context:
+            context.cancellation.check()
+        deadline.check()
+        driver.set_page_load_timeout(max(1.0, deadline.clamp(settings.PAGE_LOAD_TIMEOUT)))
+
+        try:
+            driver.get(url)
+        except TimeoutException:
+            if deadline.expired:
+                raise DeadlineExceeded
+            raise
+        finally:
+            record_usage(driver, pages=1)
+
+    def load_group_page(self, driver: WebDriver, group, context: ScrapeContext | None = None) -> None:
+        self.run_steps(self.group_page_steps(driver, group, context), context)
+
+    def group_page_steps(self, driver: WebDriver, group, context: ScrapeContext | None = None) -> Steps:
+        context = context or ScrapeContext()
+
+        for attempt in range(1, settings.GROUP_LOAD_ATTEMPTS + 1):
+            try:
+                self.load_page(driver, group.group_link, context)
+            except TimeoutException:
+                # load_page raises DeadlineExceeded instead when the deadline is what ran out.
+                logger.warning(f"Loading {group.group_link} timed out on attempt {attempt}")
+                continue
+            yield ()
+            context.deadline.check()
             assert driver.current_url == group.group_link
 
-            if driver.find_element(By.XPATH, "//div[@role='feed']"):
-                break
+            with contextlib.suppress(NoSuchElementException):
+                if driver.find_element(By.XPATH, "//div[@role='feed']"):
+                    return
+
+            logger.warning(f"No feed in {group.group_link} on attempt {attempt}")
+
+        raise NoSuchElementException(f"No feed in {group.group_link} after {settings.GROUP_LOAD_ATTEMPTS} attempts")
 
     def get_new_posts_from_recent(self, recent: list, group) -> list:
         last_lead_index = [
@@ -0,0 +1,118 @@
+import os
+from typing import Literal
+
+# Keys of drivers.LAUNCH_PROFILES; here so the API models can validate them without importing the drivers.
+LaunchProfileName = Literal["default", "low_memory", "fast_load"]
+
+
+class Settings:
+    FB_MAIN_LINK: str = os.getenv("FB_MAIN_LINK", "https://www.facebook.com/")
+
+    CHROME_VERSION_MAIN: int = int(os.getenv("CHROME_VERSION_MAIN", "112"))
+    CHROMEDRIVER_PATH: str = os.getenv("CHROMEDRIVER_PATH", "/usr/lib/chromium/chromedriver")
+    # Patched chromedriver copies, keyed by Chrome version and chromedriver build.
+    CHROMEDRIVER_CACHE_DIR: str = os.getenv("CHROMEDRIVER_CACHE_DIR", "/tmp/chromedriver-cache")
+
+    DRIVER_POOL_MIN_SIZE: int = int(os.getenv("DRIVER_POOL_MIN_SIZE", "0"))
+    DRIVER_POOL_MAX_SIZE: int = int(os.getenv("DRIVER_POOL_MAX_SIZE", "2"))
+    DRIVER_POOL_IDLE_TIMEOUT: float = float(os.getenv("DRIVER_POOL_IDLE_TIMEOUT", "300"))
+    DRIVER_POOL_LEASE_TIMEOUT: float = float(os.getenv("DRIVER_POOL_LEASE_TIMEOUT", "600"))
+    # Drivers (idle + leased) across all proxies; 0 means MAX_BROWSERS. Idle drivers of other proxies make room.
+    DRIVER_POOL_MAX_TOTAL: int = int(os.getenv("DRIVER_POOL_MAX_TOTAL", "0"))
+    # How often idle drivers are evicted and specs topped back up to DRIVER_POOL_MIN_SIZE.
+    DRIVER_POOL_MAINTENANCE_INTERVAL: float = float(os.getenv("DRIVER_POOL_MAINTENANCE_INTERVAL", "30"))
+
+    # A driver is recycled once it passes any of these limits.
+    DRIVER_MAX_PAGES: int = int(os.getenv("DRIVER_MAX_PAGES", "100"))
+    DRIVER_MAX_SCROLLS: int = int(os.getenv("DRIVER_MAX_SCROLLS", "1000"))
+    DRIVER_MAX_RSS_MB: int = int(os.getenv("DRIVER_MAX_RSS_MB", "1500"))
+    DRIVER_MAX_AGE: float = float(os.getenv("DRIVER_MAX_AGE", "3600"))
+
+    # Drivers launched at startup for each comma-separated proxy URL.
+    PREWARM_PROXY_URLS: list[str] = [url for url in os.getenv("PREWARM_PROXY_URLS", "").split(",") if url]
+    PREWARM_DRIVERS: int = int(os.getenv("PREWARM_DRIVERS", "1"))
+
+    # At most MAX_BROWSERS scrapes run at once, MAX_QUEUED_SCRAPES more may wait for a slot.
+    MAX_BROWSERS: int = int(os.getenv("MAX_BROWSERS", "2"))
+    MAX_QUEUED_SCRAPES: int = int(os.getenv("MAX_QUEUED_SCRAPES", "20"))
+    # thread runs scrapes in this process, process in supervised worker processes with their own drivers.
+    SCRAPE_EXECUTOR: str = os.getenv("SCRAPE_EXECUTOR", "thread")
+    # Restart a worker process after this many scrapes; 0 keeps workers for good.
+    PROCESS_MAX_TASKS_PER_CHILD: int = int(os.getenv("PROCESS_MAX_TASKS_PER_CHILD", "0"))
+    # Scrapes are refused (429) unless MIN_FREE_MEMORY_MB stays free after starting one more browser.
+    MIN_FREE_MEMORY_MB: int = int(os.getenv("MIN_FREE_MEMORY_MB", "512"))
+    BROWSER_MEMORY_MB: int = int(os.getenv("BROWSER_MEMORY_MB", "600"))
+    # Assumed scrape duration for Retry-After until real scrapes have been timed.
+    SCRAPE_DURATION_ESTIMATE: float = float(os.getenv("SCRAPE_DURATION_ESTIMATE", "60"))
+    # POST /scrape/batch: size limit, default per-batch concurrency and how often to retry a full executor.
+    MAX_BATCH_SIZE: int = int(os.getenv("MAX_BATCH_SIZE", "500"))
+    BATCH_CONCURRENCY: int = int(os.getenv("BATCH_CONCURRENCY", "2"))
+    BATCH_RETRY_INTERVAL: float = float(os.getenv("BATCH_RETRY_INTERVAL", "1"))
+    # Results are cached per account and group for RESULT_CACHE_TTL seconds; requests opt in with max_cache_age.
+    RESULT_CACHE_TTL: float = float(os.getenv("RESULT_CACHE_TTL", "300"))
+    RESULT_CACHE_SIZE: int = int(os.getenv("RESULT_CACHE_SIZE", "10000"))
+    # Finished jobs are kept for JOB_TTL seconds.
+    JOB_TTL: float = float(os.getenv("JOB_TTL", "3600"))
+
+    # End-to-end budget of a scrape unless the request sets its own; 0 means unlimited.
+    SCRAPE_DEADLINE: float = float(os.getenv("SCRAPE_DEADLINE", "900"))
+    PAGE_LOAD_TIMEOUT: float = float(os.getenv("PAGE_LOAD_TIMEOUT", "60"))
+    GROUP_LOAD_ATTEMPTS: int = int(os.getenv("GROUP_LOAD_ATTEMPTS", "3"))
+    # How often a stream waiting for the next group checks whether its client is still connected.
+    DISCONNECT_POLL_INTERVAL: float = float(os.getenv("DISCONNECT_POLL_INTERVAL", "1"))
+
+    # After a scroll the feed is read again as soon as it grows, polled every FEED_POLL_INTERVAL seconds, or after
+    # FEED_WAIT_TIMEOUT. Never sooner than FEED_WAIT_FLOOR plus up to FEED_WAIT_JITTER random seconds: 4 and 1 give
+    # back the old fixed, human-like pacing.
+    FEED_WAIT_TIMEOUT: float = float(os.getenv("FEED_WAIT_TIMEOUT", "5"))
+    FEED_POLL_INTERVAL: float = float(os.getenv("FEED_POLL_INTERVAL", "0.25"))
+    FEED_WAIT_FLOOR: float = float(os.getenv("FEED_WAIT_FLOOR", "0"))
+    FEED_WAIT_JITTER: float = float(os.getenv("FEED_WAIT_JITTER", "0.5"))
+    # script hovers the placeholder post links of new articles in one call with synthetic events, actions moves
+    # the real mouse to every placeholder link on the page, one WebDriver call each.
+    POST_LINK_HOVER: str = os.getenv("POST_LINK_HOVER", "script")
+    # HTML read after each scroll: page (all of page_source), feed (the feed element only) or new_articles (only
+    # the posts not read before, falling back to feed when posts aren't numbered).
+    FEED_EXTRACTION: str = os.getenv("FEED_EXTRACTION", "new_articles")
+    # A feed that didn't grow for this many scrolls in a row has nothing more to show.
+    FEED_MAX_STAGNANT_STEPS: int = int(os.getenv("FEED_MAX_STAGNANT_STEPS", "3"))
+
+    # Scrape an account's groups in parallel tabs of one browser instead of one after another.
+    MULTI_TAB_GROUPS: bool = os.getenv("MULTI_TAB_GROUPS", "false").lower() == "true"
+    MAX_TABS: int = int(os.getenv("MAX_TABS", "4"))
+
+    # One of LaunchProfileName: default, low_memory, fast_load. Accounts may override it.
+    CHROME_LAUNCH_PROFILE: str = os.getenv("CHROME_LAUNCH_PROFILE", "default")
+
+    # Requests aborted by the selenium-wire interceptor: resource types and URL regexes (tracking beacons).
+    REQUEST_BLOCKING: bool = os.getenv("REQUEST_BLOCKING", "true").lower() == "true"
+    BLOCKED_RESOURCE_TYPES: list[str] = os.getenv("BLOCKED_RESOURCE_TYPES", "video,audio,font,image").split(",")
+    BLOCKED_URL_PATTERNS: list[str] = [
+        pattern
+        for pattern in os.getenv(
+            "BLOCKED_URL_PATTERNS",
+            r"/ajax/bz|/ajax/qm/|/ajax/webstorage/|/logging_client_events|facebook\.com/tr[/?]"
+            r"|google-analytics\.com|googletagmanager\.com|doubleclick\.net|/security/hsts-pixel",
+        ).split("|")
+        if pattern
+    ]
+
+    # wire routes traffic through selenium-wire's MITM proxy, native lets Chrome talk to the proxy directly
+    # (request interception and capture are then unavailable, blocking falls back to file extensions).
+    PROXY_MODE: str = os.getenv("PROXY_MODE", "wire")
+
+    # selenium-wire request capture: off, scoped (only CAPTURE_SCOPES URL regexes) or capped.
+    # Scoped and capped keep at most CAPTURE_MAX_REQUESTS requests, evicting the oldest. selenium-wire doesn't
+    # intercept requests outside the scopes either, so scoped requires REQUEST_BLOCKING=false (checked at startup).
+    CAPTURE_MODE: str = os.getenv("CAPTURE_MODE", "off")
+    CAPTURE_SCOPES: list[str] = [scope for scope in os.getenv("CAPTURE_SCOPES", r"/api/graphql/").split(",") if scope]
+    CAPTURE_MAX_REQUESTS: int = int(os.getenv("CAPTURE_MAX_REQUESTS", "200"))
+
+    # Empty disables persistent per-account profiles.
+    CHROME_PROFILES_DIR: str = os.getenv("CHROME_PROFILES_DIR", "")
+    CHROME_PROFILE_MAX_MB: int = int(os.getenv("CHROME_PROFILE_MAX_MB", "200"))
+    CHROME_PROFILE_MAX_IDLE_DAYS: float = float(os.getenv("CHROME_PROFILE_MAX_IDLE_DAYS", "14"))
+    CHROME_PROFILE_LOCK_TIMEOUT: float = float(os.getenv("CHROME_PROFILE_LOCK_TIMEOUT", "30"))
+
+
+settings = Settings()
@@ -0,0 +1,68 @@
+import math
+import threading
+import time
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class ScrapeCancelled(Exception):
+    pass
+
+
+class Deadline:
+    """A wall-clock budget for one scrape; no ``seconds`` means unlimited.
+
+    Based on ``time.time()`` rather than the monotonic clock so it keeps its meaning when pickled into a
+    worker process.
+    """
+
+    def __init__(self, seconds: float | None = None, expires_at: float | None = None):
+        self.expires_at = expires_at if expires_at is not None else (time.time() + seconds if seconds else None)
+
+    @property
+    def remaining(self) -> float:
+        return math.inf if self.expires_at is None else max(0.0, self.expires_at - time.time())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining <= 0
+
+    def share(self, parts: int) -> "Deadline":
+        """An equal share of what is left, for one of ``parts`` steps still to run."""
+        if self.expires_at is None:
+            return self
+        return Deadline(expires_at=time.time() + self.remaining / max(parts, 1))
+
+    def clamp(self, seconds: float) -> float:
+        return min(seconds, self.remaining)
+
+    def check(self) -> None:
+        if self.expired:
+            raise DeadlineExceeded
+
+
+class CancellationToken:
+    """Cooperative cancellation: the scrape checks it at every wait and stops at the next one once cancelled.
+
+    Backed by a ``threading.Event`` by default; pass a manager ``Event`` to cancel a scrape in another process.
+    """
+
+    def __init__(self, event=None):
+        self.event = event or threading.Event()
+
+    def cancel(self) -> None:
+        self.event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.event.is_set()
+
+    def wait(self, seconds: float) -> bool:
+        """Sleep up to ``seconds``, returning early (and True) when cancelled meanwhile."""
+        return self.event.wait(seconds)
+
+    def check(self) -> None:
+        if self.cancelled:
+            raise ScrapeCancelled